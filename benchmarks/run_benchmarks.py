@@ -0,0 +1,307 @@
+"""
+Бенчмарки горячих путей Змейки.
+
+Каждый бенчмарк меряет время одной операции в наносекундах для нескольких
+длин змейки, заполненностей и размеров поля. Результаты пишутся в JSON
+и сравниваются с сохраненным базовым файлом. Кроме абсолютного времени
+проверяется масштабирование: время тика не должно расти вместе с длиной
+змейки, это ловит O(n) в цикле игры независимо от скорости машины.
+
+    python benchmarks/run_benchmarks.py
+    python benchmarks/run_benchmarks.py --update-baseline
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import timeit
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BASE_DIR))
+
+# Отрисовка меряется без окна
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+
+import snake_engine as engine  # noqa: E402
+
+BENCHMARKS_DIR = Path(__file__).resolve().parent
+BASELINE_PATH = BENCHMARKS_DIR / 'baseline.json'
+RESULTS_PATH = BENCHMARKS_DIR / 'results.json'
+
+# Длины змейки и доли занятых клеток поля, для которых идут замеры
+SNAKE_LENGTHS = (1, 10, 100, 500)
+OCCUPANCIES = (0.0, 0.5, 0.9, 0.99)
+
+# Размеры поля в клетках: обычное поле и большое, где индекс свободных
+# клеток хранится разреженно
+BOARD_SIZES = ((engine.GRID_WIDTH, engine.GRID_HEIGHT), (2000, 2000))
+
+# Во сколько раз операция может замедлиться относительно базового файла.
+# Абсолютное время заметно плавает от запуска к запуску, поэтому допуск
+# ловит только грубые замедления, а O(n) ловит проверка масштабирования
+DEFAULT_TOLERANCE = 3.0
+
+# Сколько вызовов операции, меняющей состояние, делается за один повтор
+STATEFUL_CALLS = 2000
+
+# Во сколько раз операция тика может замедлиться при росте змейки
+# от самой короткой до самой длинной - больший рост означает O(n)
+MAX_SCALING = 3.0
+
+# Бенчмарки, время которых не должно зависеть от длины змейки
+SCALING_BENCHMARKS = ('snake_move', 'check_snake_events')
+
+# Модули, время импорта которых отслеживается
+IMPORTED_MODULES = ('snake_engine', 'the_snake')
+
+# Сколько раз повторяется импорт в новом процессе
+IMPORT_REPEAT = 5
+
+IMPORT_SCRIPT = (
+    'import time; start = time.perf_counter(); import {module}; '
+    'print(time.perf_counter() - start)'
+)
+
+
+def serpentine(length):
+    """Функция возвращает клетки змейки заданной длины змейкой по полю."""
+    cells = []
+    for y in range(0, engine.SCREEN_HEIGHT, engine.GRID_SIZE):
+        row = range(0, engine.SCREEN_WIDTH, engine.GRID_SIZE)
+        if y // engine.GRID_SIZE % 2:
+            row = reversed(row)
+        cells.extend((x, y) for x in row)
+    return cells[:length]
+
+
+def make_snake(length, free_cells=None):
+    """Функция создает змейку заданной длины."""
+    snake = engine.Snake(free_cells=free_cells)
+    snake.positions.clear()
+    snake.positions.extend(serpentine(length))
+    snake.length = length
+    return snake
+
+
+def measure(func, repeat=3):
+    """Функция возвращает лучшее время одного вызова func в нс."""
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat, number)) / number * 1e9
+
+
+def measure_stateful(make, number=STATEFUL_CALLS, repeat=5):
+    """
+    Функция возвращает лучшее время одного вызова операции, которая меняет
+    состояние (ход змейки, тик партии), в нс. Перед каждым повтором make
+    создает состояние заново и возвращает замеряемый вызов, а число вызовов
+    постоянно, поэтому все повторы меряют одну и ту же работу.
+    """
+    times = [timeit.Timer(make()).timeit(number) for _ in range(repeat)]
+    return min(times) / number * 1e9
+
+
+def bench_snake_move():
+    """Бенчмарк Snake.move для разных длин змейки."""
+    for length in SNAKE_LENGTHS:
+        yield (f'snake_move[length={length}]', measure_stateful(
+            lambda: make_snake(length, engine.FreeCells()).move))
+
+
+def bench_check_snake_events():
+    """Бенчмарк check_snake_events для разных длин змейки."""
+    for length in SNAKE_LENGTHS:
+        snake = make_snake(length)
+        apple = engine.Apple(occupied_cells=snake.positions)
+        yield (f'check_snake_events[length={length}]',
+               measure(lambda: engine.check_snake_events(snake, apple)))
+
+
+def bench_randomize_position():
+    """Бенчмарк Apple.randomize_position при разной заполненности поля."""
+    def make_apple(occupancy):
+        free_cells = engine.FreeCells(rng=engine.random.Random(0))
+        cells = list(free_cells.cells)
+        for cell in cells[:int(len(cells) * occupancy)]:
+            free_cells.occupy(cell)
+        return engine.Apple(free_cells=free_cells).randomize_position
+
+    for occupancy in OCCUPANCIES:
+        yield (f'randomize_position[occupancy={occupancy}]',
+               measure_stateful(lambda: make_apple(occupancy)))
+
+
+def bench_board_sizes():
+    """
+    Бенчмарк хода змейки, выбора клетки для яблока и тика партии
+    на полях разного размера.
+    """
+    def make_snake_move(board_size):
+        free_cells = engine.FreeCells(rng=engine.random.Random(0),
+                                      board_size=board_size)
+        snake = engine.Snake(free_cells=free_cells, board_size=board_size)
+        snake.length = 10
+        return snake.move
+
+    def make_apple(board_size):
+        free_cells = engine.FreeCells(rng=engine.random.Random(0),
+                                      board_size=board_size)
+        return engine.Apple(free_cells=free_cells).randomize_position
+
+    def make_game(board_size):
+        return engine.Game(difficulty=2, seed=0, board_size=board_size).step
+
+    for board_size in BOARD_SIZES:
+        board = '{}x{}'.format(*board_size)
+        yield (f'snake_move[board={board}]',
+               measure_stateful(lambda: make_snake_move(board_size)))
+        yield (f'randomize_position[board={board}]',
+               measure_stateful(lambda: make_apple(board_size)))
+        yield (f'game_step[board={board}]',
+               measure_stateful(lambda: make_game(board_size)))
+
+
+def bench_get_occupied_positions():
+    """Бенчмарк get_occupied_positions для разных длин змейки."""
+    game = engine.Game(difficulty=2, seed=0)
+    for length in SNAKE_LENGTHS:
+        snake = make_snake(length)
+        yield (f'get_occupied_positions[length={length}]',
+               measure(lambda: engine.get_occupied_positions(
+                   snake, game.apple, *game.figs, game.stone_wall)))
+
+
+def bench_render():
+    """Бенчмарк отрисовки кадра целиком и кадра после одного тика."""
+    import pygame as pg
+
+    import the_snake
+
+    pg.init()
+    the_snake.init_display()
+    game = the_snake.SnakeGame(difficulty=2, seed=0)
+
+    def full_frame():
+        the_snake.redraw_board(game)
+        the_snake.render_frame(game)
+
+    def make_tick_frame():
+        game = the_snake.SnakeGame(difficulty=2, seed=0)
+        the_snake.render_frame(game)
+
+        def tick_frame():
+            the_snake.game_tick(game)
+            the_snake.render_frame(game)
+        return tick_frame
+
+    yield 'render[full_frame]', measure(full_frame)
+    yield 'render[tick_frame]', measure_stateful(make_tick_frame, 200)
+
+
+def bench_import():
+    """
+    Бенчмарк импорта модулей в новом процессе: импорт не должен открывать
+    окно и дорожать со временем.
+    """
+    for module in IMPORTED_MODULES:
+        times = []
+        for _ in range(IMPORT_REPEAT):
+            output = subprocess.run(
+                [sys.executable, '-c', IMPORT_SCRIPT.format(module=module)],
+                cwd=BASE_DIR, capture_output=True, text=True, check=True,
+            ).stdout
+            times.append(float(output.splitlines()[-1]))
+        yield f'import[{module}]', min(times) * 1e9
+
+
+BENCHMARKS = (
+    bench_import,
+    bench_snake_move,
+    bench_check_snake_events,
+    bench_randomize_position,
+    bench_board_sizes,
+    bench_get_occupied_positions,
+    bench_render,
+)
+
+
+def run_benchmarks():
+    """Функция запускает все бенчмарки и возвращает словарь результатов."""
+    results = {}
+    for benchmark in BENCHMARKS:
+        for name, nanoseconds in benchmark():
+            results[name] = round(nanoseconds, 1)
+            print(f'{name:45} {nanoseconds:12.1f} нс')
+    return results
+
+
+def check_scaling(results):
+    """
+    Функция проверяет, что время операций тика не растет с длиной змейки.
+    Возвращает список сообщений о нарушениях.
+    """
+    problems = []
+    for name in SCALING_BENCHMARKS:
+        shortest = results[f'{name}[length={SNAKE_LENGTHS[0]}]']
+        longest = results[f'{name}[length={SNAKE_LENGTHS[-1]}]']
+        if longest > shortest * MAX_SCALING:
+            problems.append(
+                f'{name}: длина {SNAKE_LENGTHS[-1]} медленнее длины '
+                f'{SNAKE_LENGTHS[0]} в {longest / shortest:.1f} раз')
+    return problems
+
+
+def compare_with_baseline(results, baseline, tolerance):
+    """
+    Функция сравнивает результаты с базовыми.
+    Возвращает список сообщений о замедлениях.
+    """
+    problems = []
+    for name, nanoseconds in results.items():
+        base = baseline.get(name)
+        if base and nanoseconds > base * tolerance:
+            problems.append(f'{name}: {nanoseconds:.1f} нс, базовое '
+                            f'{base:.1f} нс ({nanoseconds / base:.2f}x)')
+    return problems
+
+
+def main(args=None):
+    """Функция запускает бенчмарки, сохраняет и проверяет результаты."""
+    parser = argparse.ArgumentParser(description='Бенчмарки Змейки')
+    parser.add_argument('--output', default=str(RESULTS_PATH),
+                        help='файл для результатов в JSON')
+    parser.add_argument('--baseline', default=str(BASELINE_PATH),
+                        help='базовый файл для сравнения')
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                        help='допустимое замедление относительно базового')
+    parser.add_argument('--update-baseline', action='store_true',
+                        help='записать результаты в базовый файл')
+    args = parser.parse_args(args)
+    report = {
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'board': [engine.GRID_WIDTH, engine.GRID_HEIGHT],
+        'results': run_benchmarks(),
+    }
+    with open(args.output, 'w') as file:
+        json.dump(report, file, indent=2, ensure_ascii=False)
+    if args.update_baseline:
+        with open(args.baseline, 'w') as file:
+            json.dump(report, file, indent=2, ensure_ascii=False)
+        return 0
+    problems = check_scaling(report['results'])
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as file:
+            baseline = json.load(file)['results']
+        problems += compare_with_baseline(report['results'], baseline,
+                                          args.tolerance)
+    for problem in problems:
+        print('РЕГРЕССИЯ:', problem)
+    return 1 if problems else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,217 @@
+"""
+Автопилот Змейки: контроллер, который ведет змейку к яблоку.
+
+Автопилот заменяет handle_keys в игре (клавиша A) и подходит как контроллер
+для snake_tournament: получает партию Game и возвращает направление.
+Основа автопилота - поле расстояний до яблока (DistanceField): поиск
+в ширину от яблока в обход стены и инжиров с переходом через край поля.
+Занятые соседи клетки берутся из слоев индекса свободных клеток партии
+(FreeCells.free_neighbours), автопилот не собирает свои множества клеток.
+Поле зависит только от еды и стены, которые меняются редко, поэтому оно
+строится один раз на каждое положение яблока и переиспользуется между
+тиками, а на большом поле достраивается порциями, пока не дойдет до головы.
+Змейка идет по убыванию расстояния. Если дорогу перекрыло ее тело, обход
+ищется A*: поле расстояний точное для поля без змейки, поэтому служит
+эвристикой и поиск почти не отклоняется от кратчайшего пути. Найденный путь
+тоже запоминается и используется, пока он свободен.
+
+    python snake_tournament.py --controller snake_autopilot:autopilot
+"""
+import heapq
+import weakref
+from collections import deque
+
+from snake_engine import (FIG_LAYER, GRID_SIZE, OPPOSITE_DIRECTIONS,
+                          SNAKE_LAYER, WALL_LAYER)
+
+# Сколько клеток поле расстояний может раскрыть за один тик
+FIELD_BUDGET = 5000
+
+# Сколько клеток поиск обхода A* может раскрыть за один тик
+SEARCH_BUDGET = 2000
+
+# Слои препятствий поля расстояний: они меняются только вместе
+# с board_version. Змейка обходится отдельно - она двигается каждый тик
+FIELD_LAYERS = (FIG_LAYER, WALL_LAYER)
+MOVE_LAYERS = (SNAKE_LAYER, *FIELD_LAYERS)
+
+
+def toroidal_distance(cell, other, width, height):
+    """Функция возвращает число клеток между клетками без препятствий."""
+    dx = abs(cell[0] - other[0])
+    dy = abs(cell[1] - other[1])
+    return (min(dx, width - dx) + min(dy, height - dy)) // GRID_SIZE
+
+
+class DistanceField:
+    """
+    Класс поля расстояний в клетках до цели (target) в обход инжиров и стен
+    по слоям индекса свободных клеток free_cells. Поиск в ширину идет
+    порциями: frontier - очередь найденных, но еще не раскрытых клеток,
+    distances - найденные расстояния.
+    """
+
+    def __init__(self, target, free_cells):
+        """Метод инициализации поля по индексу свободных клеток партии."""
+        self.target = target
+        self.free_cells = free_cells
+        self.width = free_cells.width
+        self.height = free_cells.height
+        self.distances = {target: 0}
+        self.frontier = deque([target])
+
+    def estimate(self, cell):
+        """
+        Метод возвращает расстояние до цели из поля, а для клеток, до которых
+        поле еще не достроено, - расстояние без препятствий.
+        """
+        distance = self.distances.get(cell)
+        if distance is None:
+            return toroidal_distance(cell, self.target, self.width,
+                                     self.height)
+        return distance
+
+    def reach(self, cell, budget):
+        """
+        Метод достраивает поле, пока не станут известны расстояния до cell
+        и всех ее соседей или пока не будет раскрыто budget клеток.
+        Возвращает расстояние до cell или None.
+        """
+        distances, frontier = self.distances, self.frontier
+        while budget and frontier and (
+                cell not in distances
+                or distances[frontier[0]] <= distances[cell]):
+            current = frontier.popleft()
+            distance = distances[current] + 1
+            for _, following in self.free_cells.free_neighbours(
+                    current, FIELD_LAYERS):
+                if following not in distances:
+                    distances[following] = distance
+                    frontier.append(following)
+            budget -= 1
+        return distances.get(cell)
+
+
+class Autopilot:
+    """
+    Класс автопилота одной партии.
+    Атрибут field - поле расстояний до яблока, key - слабая ссылка
+    на партию и номер расстановки еды и стен (board_version), для которых
+    оно построено,
+    path - клетки найденного обхода тела от следующей клетки до яблока.
+    """
+
+    def __init__(self, field_budget=FIELD_BUDGET,
+                 search_budget=SEARCH_BUDGET):
+        """Метод инициализации автопилота с бюджетами поиска на тик."""
+        self.field_budget = field_budget
+        self.search_budget = search_budget
+        self.field = None
+        self.key = None
+        self.path = deque()
+
+    def __call__(self, game):
+        """
+        Метод возвращает направление змейки на следующий тик или None,
+        если безопасного хода нет.
+        """
+        self.update_field(game)
+        snake = game.snake
+        head = snake.get_head_position()
+        moves = {
+            cell: direction
+            for direction, cell in game.free_cells.free_neighbours(
+                head, MOVE_LAYERS)
+            if direction != OPPOSITE_DIRECTIONS[snake.direction]
+        }
+        if not moves:
+            return None
+        cell = (self.follow_path(moves) or self.descend(head, moves)
+                or self.search(head, moves))
+        if cell is None:
+            cell = min(moves, key=self.field.estimate)
+        return moves[cell]
+
+    def update_field(self, game):
+        """
+        Метод строит поле расстояний заново, если сдвинулись еда и стены
+        или сменилась карта уровня. Клетки не сравниваются: партия сама
+        считает перестановки в board_version.
+        """
+        # Слабая ссылка не держит партию: автопилоты хранятся в pilots
+        # по партиям, и сильная ссылка в key не дала бы их удалить
+        key = (weakref.ref(game), game.board_version)
+        if key != self.key:
+            self.key = key
+            self.field = DistanceField(game.apple.position, game.free_cells)
+            self.path.clear()
+
+    def follow_path(self, moves):
+        """Метод возвращает следующую клетку запомненного обхода или None."""
+        if self.path and self.path[0] in moves:
+            return self.path.popleft()
+        self.path.clear()
+        return None
+
+    def descend(self, head, moves):
+        """
+        Метод возвращает соседнюю клетку, которая ближе к яблоку по полю
+        расстояний, или None, если такой нет или поле еще не достроено.
+        """
+        distance = self.field.reach(head, self.field_budget)
+        if distance is None:
+            return None
+        distances = self.field.distances
+        cell = min(moves, key=lambda cell: distances.get(cell, distance))
+        if distances.get(cell, distance) < distance:
+            return cell
+        return None
+
+    def search(self, head, moves):
+        """
+        Метод ищет A* путь от головы к яблоку в обход тела змейки
+        и запоминает его. Возвращает первую клетку пути или None.
+        """
+        field = self.field
+        parents = dict.fromkeys(moves, head)
+        queue = [(1 + field.estimate(cell), -1, cell) for cell in moves]
+        heapq.heapify(queue)
+        costs = dict.fromkeys(moves, 1)
+        for _ in range(self.search_budget):
+            if not queue:
+                return None
+            _, cost, cell = heapq.heappop(queue)
+            if cell == field.target:
+                return self.remember_path(parents, head, cell)
+            cost = -cost
+            if cost > costs[cell]:
+                continue
+            cost += 1
+            for _, following in field.free_cells.free_neighbours(
+                    cell, MOVE_LAYERS):
+                if cost < costs.get(following, cost + 1):
+                    costs[following] = cost
+                    parents[following] = cell
+                    heapq.heappush(queue, (cost + field.estimate(following),
+                                           -cost, following))
+        return None
+
+    def remember_path(self, parents, head, cell):
+        """Метод запоминает путь от головы до cell и возвращает его начало."""
+        self.path.clear()
+        while cell != head:
+            self.path.appendleft(cell)
+            cell = parents[cell]
+        return self.path.popleft()
+
+
+# Автопилоты партий для контроллера autopilot
+pilots = weakref.WeakKeyDictionary()
+
+
+def autopilot(game):
+    """Контроллер для snake_tournament: свой автопилот для каждой партии."""
+    pilot = pilots.get(game)
+    if pilot is None:
+        pilot = pilots[game] = Autopilot()
+    return pilot(game)
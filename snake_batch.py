@@ -0,0 +1,218 @@
+"""
+Пакетный движок Змейки на NumPy: N независимых партий за один вызов step.
+
+Состояние всех партий хранится в массивах, клетка поля задается номером
+x * GRID_HEIGHT + y. Правила совпадают с Game из snake_engine: партии
+создаются обычным движком с тем же seed, а затем ходы, поедание еды,
+столкновения и сбросы повторяют его шаг в векторном виде. Появление еды
+и сброс змейки - редкие события, они обрабатываются по одной партии с тем же
+генератором случайных чисел, что и в обычном движке, поэтому при одинаковых
+seed и действиях результаты совпадают.
+"""
+import numpy as np
+
+from snake_engine import (DIRECTIONS, GRID_HEIGHT, GRID_SIZE, GRID_WIDTH,
+                          RIGHT, SCREEN_MIDDLE, Game)
+
+# Количество клеток поля
+CELLS = GRID_WIDTH * GRID_HEIGHT
+
+# Смещения по осям для каждого кода действия из DIRECTIONS
+DIRECTION_DX = np.array([dx for dx, _ in DIRECTIONS], dtype=np.int32)
+DIRECTION_DY = np.array([dy for _, dy in DIRECTIONS], dtype=np.int32)
+
+# Код противоположного направления для каждого кода действия
+OPPOSITE_ACTIONS = np.array([1, 0, 3, 2], dtype=np.int8)
+
+# Код действия "не поворачивать"
+NO_TURN = -1
+
+
+def position_to_cell(position):
+    """Функция переводит позицию в пикселях в номер клетки."""
+    return position[0] // GRID_SIZE * GRID_HEIGHT + position[1] // GRID_SIZE
+
+
+def cell_to_position(cell):
+    """Функция переводит номер клетки в позицию в пикселях."""
+    x, y = divmod(int(cell), GRID_HEIGHT)
+    return x * GRID_SIZE, y * GRID_SIZE
+
+
+class BatchGame:
+    """
+    Класс пакета партий одного уровня сложности.
+    Атрибуты-массивы (первое измерение - номер партии):
+    body - кольцевой буфер клеток змейки, head_index - индекс головы в нем,
+    sizes - клеток в теле, lengths - длина змейки, directions - код
+    направления, body_counts - сколько раз змейка занимает клетку,
+    counts - сколько объектов занимает клетку, free/free_index/free_sizes -
+    индекс свободных клеток (как FreeCells), apples, figs - клетки еды,
+    fig_index - номер инжира в клетке или -1, walls - маска клеток стен.
+    """
+
+    def __init__(self, seeds, difficulty=1):
+        """Метод создает партии с заданными seed через обычный движок."""
+        games = [Game(difficulty, seed=seed) for seed in seeds]
+        self.rngs = [game.rng for game in games]
+        self.size = len(games)
+        self.games = np.arange(self.size)
+        fig_count = len(games[0].figs) if games else 0
+        # В буфере на одну клетку больше поля: голова добавляется до того,
+        # как убирается хвост
+        self.body = np.zeros((self.size, CELLS + 1), dtype=np.int32)
+        self.head_index = np.zeros(self.size, dtype=np.int32)
+        self.sizes = np.zeros(self.size, dtype=np.int32)
+        self.lengths = np.zeros(self.size, dtype=np.int32)
+        self.directions = np.zeros(self.size, dtype=np.int8)
+        self.body_counts = np.zeros((self.size, CELLS), dtype=np.int16)
+        self.counts = np.zeros((self.size, CELLS), dtype=np.int16)
+        self.free = np.zeros((self.size, CELLS), dtype=np.int32)
+        self.free_index = np.full((self.size, CELLS), -1, dtype=np.int32)
+        self.free_sizes = np.zeros(self.size, dtype=np.int32)
+        self.apples = np.zeros(self.size, dtype=np.int32)
+        self.figs = np.zeros((self.size, fig_count), dtype=np.int32)
+        self.fig_index = np.full((self.size, CELLS), -1, dtype=np.int32)
+        self.walls = np.zeros((self.size, CELLS), dtype=bool)
+        for g, game in enumerate(games):
+            self._load(g, game)
+
+    def _load(self, g, game):
+        """Метод копирует состояние обычной партии в массивы."""
+        body = [position_to_cell(p) for p in game.snake.positions]
+        self.body[g, :len(body)] = body
+        self.sizes[g] = len(body)
+        self.lengths[g] = game.snake.length
+        self.directions[g] = DIRECTIONS.index(game.snake.direction)
+        for position, count in game.snake.positions.cells.items():
+            self.body_counts[g, position_to_cell(position)] = count
+        for position, count in game.free_cells.counts.items():
+            self.counts[g, position_to_cell(position)] = count
+        free = [position_to_cell(p) for p in game.free_cells.cells]
+        self.free[g, :len(free)] = free
+        self.free_index[g, free] = np.arange(len(free))
+        self.free_sizes[g] = len(free)
+        self.apples[g] = position_to_cell(game.apple.position)
+        self.figs[g] = [position_to_cell(fig.position) for fig in game.figs]
+        self.fig_index[g, self.figs[g]] = np.arange(len(game.figs))
+        for wall in game.obstacles:
+            self.walls[g, [position_to_cell(p) for p in wall.positions]] = True
+
+    @property
+    def heads(self):
+        """Клетки голов змеек всех партий."""
+        return self.body[self.games, self.head_index]
+
+    def get_body(self, g):
+        """Метод возвращает клетки змейки партии g от головы к хвосту."""
+        ring = (self.head_index[g] + np.arange(self.sizes[g])) % (CELLS + 1)
+        return self.body[g, ring]
+
+    def _occupy(self, games, cells):
+        """Метод занимает по одной клетке в каждой из партий games."""
+        was_free = self.counts[games, cells] == 0
+        self.counts[games, cells] += 1
+        games, cells = games[was_free], cells[was_free]
+        # Удаление из индекса свободных клеток перестановкой с последней
+        i = self.free_index[games, cells]
+        self.free_sizes[games] -= 1
+        last = self.free[games, self.free_sizes[games]]
+        self.free[games, i] = last
+        self.free_index[games, last] = i
+        self.free_index[games, cells] = -1
+
+    def _release(self, games, cells):
+        """Метод освобождает по одной клетке в каждой из партий games."""
+        self.counts[games, cells] -= 1
+        now_free = self.counts[games, cells] == 0
+        games, cells = games[now_free], cells[now_free]
+        self.free[games, self.free_sizes[games]] = cells
+        self.free_index[games, cells] = self.free_sizes[games]
+        self.free_sizes[games] += 1
+
+    def _respawn(self, g, cell):
+        """
+        Метод переносит еду партии g из клетки cell на случайную свободную
+        клетку и возвращает новую клетку, как randomize_position.
+        """
+        games = self.games[g:g + 1]
+        self._release(games, np.array([cell]))
+        if self.free_sizes[g]:
+            cell = self.free[g, self.rngs[g].randrange(self.free_sizes[g])]
+        self._occupy(games, np.array([cell]))
+        return cell
+
+    def _reset_snake(self, g):
+        """Метод возвращает змейку партии g к исходному состоянию."""
+        games = self.games[g:g + 1]
+        for cell in self.get_body(g):
+            self._release(games, np.array([cell]))
+        self.body_counts[g] = 0
+        middle = position_to_cell(SCREEN_MIDDLE)
+        self.body[g, self.head_index[g]] = middle
+        self.body_counts[g, middle] = 1
+        self._occupy(games, np.array([middle]))
+        self.sizes[g] = 1
+        self.lengths[g] = 1
+        self.directions[g] = DIRECTIONS.index(RIGHT)
+
+    def _move(self):
+        """Метод двигает змейки всех партий на одну клетку."""
+        games = self.games
+        x, y = np.divmod(self.heads, GRID_HEIGHT)
+        x = (x + DIRECTION_DX[self.directions]) % GRID_WIDTH
+        y = (y + DIRECTION_DY[self.directions]) % GRID_HEIGHT
+        heads = (x * GRID_HEIGHT + y).astype(np.int32)
+        self.head_index = (self.head_index - 1) % (CELLS + 1)
+        self.body[games, self.head_index] = heads
+        self.sizes += 1
+        self.body_counts[games, heads] += 1
+        self._occupy(games, heads)
+        # Хвост убирается не больше двух раз: после поедания инжира
+        # длина змейки уменьшается на 1
+        for _ in range(2):
+            games = self.games[self.sizes > self.lengths]
+            tails = self.body[
+                games,
+                (self.head_index[games] + self.sizes[games] - 1) % (CELLS + 1)
+            ]
+            self.sizes[games] -= 1
+            self.body_counts[games, tails] -= 1
+            self._release(games, tails)
+        return heads
+
+    def step(self, actions):
+        """
+        Метод выполняет один тик во всех партиях.
+        actions - коды направлений из DIRECTIONS или NO_TURN для каждой
+        партии. Возвращает маску партий, в которых змейка разбилась.
+        """
+        actions = np.asarray(actions, dtype=np.int8)
+        turn = (actions != NO_TURN) & (
+            actions != OPPOSITE_ACTIONS[self.directions])
+        self.directions = np.where(turn, actions, self.directions)
+        heads = self._move()
+        # Поедание яблока и столкновение с собой
+        ate = heads == self.apples
+        self.lengths[ate] += 1
+        for g in np.flatnonzero(ate):
+            self.apples[g] = self._respawn(g, self.apples[g])
+        crashed = ~ate & (self.body_counts[self.games, heads] > 1)
+        for g in np.flatnonzero(crashed):
+            self._reset_snake(g)
+        # Поедание инжиров: номер инжира в клетке головы по индексу,
+        # без перебора всех инжиров
+        heads = self.heads
+        eaten = self.fig_index[self.games, heads]
+        ate = eaten >= 0
+        self.lengths[ate & (self.lengths > 1)] -= 1
+        for g in np.flatnonzero(ate):
+            f = eaten[g]
+            self.fig_index[g, self.figs[g, f]] = -1
+            self.figs[g, f] = self._respawn(g, self.figs[g, f])
+            self.fig_index[g, self.figs[g, f]] = f
+        # Столкновение со стеной
+        bumped = self.walls[self.games, heads]
+        for g in np.flatnonzero(bumped):
+            self._reset_snake(g)
+        return crashed | bumped
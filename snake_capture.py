@@ -0,0 +1,162 @@
+"""
+Запись кадров игры в видео или последовательность PNG без замедления игры.
+
+После вывода кадра на дисплей главный цикл передает экран в FrameCapture:
+копируются только изменившиеся за кадр области, копии встают в ограниченную
+очередь. Фоновый поток собирает из областей полный кадр и отдает его
+приемнику, который кодирует кадр и пишет его на диск или в канал. Главный
+цикл никогда не ждет диска: если очередь заполнена, кадр пропускается,
+а следующий копируется целиком.
+
+Приемник - любой объект с методами write(surface) и close(): RawFrameSink
+пишет кадры подряд как байты RGB (подходит для ffmpeg), PngSink - файлами
+PNG в каталог.
+
+Кадр записывается, только когда игра сделала тик, а не с частотой кадров
+FPS, поэтому частота записи - скорость уровня (speed в таблице уровней:
+10 тиков в секунду на уровне 1 и 20 на уровне 2). Ее и нужно передать
+ffmpeg:
+
+    python the_snake.py --capture frames.rgb
+    ffmpeg -f rawvideo -pix_fmt rgb24 -s 640x480 -r 20 -i frames.rgb out.mp4
+    python the_snake.py --capture - | ffmpeg -f rawvideo ... -i - out.mp4
+    python the_snake.py --capture frames/
+"""
+import os
+import queue
+import sys
+import threading
+
+import pygame as pg
+
+# Сколько кадров может ждать записи - при 20 тиках в секунду это 6 с
+CAPTURE_QUEUE_SIZE = 120
+
+
+class RawFrameSink:
+    """Приемник кадров: байты RGB кадров подряд в файл или канал."""
+
+    def __init__(self, target):
+        """
+        Метод инициализации приемника. target - путь к файлу, '-' для
+        стандартного вывода или открытый двоичный файл.
+        """
+        self.owned = isinstance(target, (str, os.PathLike)) and target != '-'
+        if target == '-':
+            target = sys.stdout.buffer
+        elif self.owned:
+            target = open(target, 'wb')
+        self.file = target
+
+    def write(self, surface):
+        """Метод пишет кадр."""
+        self.file.write(pg.image.tobytes(surface, 'RGB'))
+
+    def close(self):
+        """Метод дописывает буфер и закрывает файл, если открывал его сам."""
+        self.file.flush()
+        if self.owned:
+            self.file.close()
+
+
+class PngSink:
+    """Приемник кадров: файлы frame_000000.png, frame_000001.png, ..."""
+
+    def __init__(self, directory):
+        """Метод инициализации приемника, каталог создается при нужде."""
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.frames = 0
+
+    def write(self, surface):
+        """Метод пишет кадр в следующий файл."""
+        pg.image.save(surface, os.path.join(
+            self.directory, f'frame_{self.frames:06d}.png'))
+        self.frames += 1
+
+    def close(self):
+        """Файлы закрываются после каждого кадра, закрывать нечего."""
+
+
+def open_sink(target):
+    """
+    Функция выбирает приемник по цели записи: каталог (или путь с / на конце)
+    - кадры PNG, иначе - байты RGB в файл или '-' в стандартный вывод.
+    """
+    if target != '-' and (os.path.isdir(target)
+                          or target.endswith(('/', os.sep))):
+        return PngSink(target)
+    return RawFrameSink(target)
+
+
+class FrameCapture:
+    """
+    Класс записи кадров в фоновом потоке.
+    Атрибут sink - приемник кадров, frames - очередь кадров: пар (размер
+    экрана, список пар (копия области, область)), dropped - число
+    пропущенных кадров, full - следующий кадр нужно скопировать целиком,
+    error - ошибка приемника, остановившая запись, или None.
+    """
+
+    def __init__(self, sink, queue_size=CAPTURE_QUEUE_SIZE):
+        """Метод инициализации записи и запуска потока кодирования."""
+        self.sink = sink
+        self.frames = queue.Queue(queue_size)
+        self.dropped = 0
+        self.full = True
+        self.error = None
+        self.thread = threading.Thread(target=self.encode,
+                                       name='frame-capture', daemon=True)
+        self.thread.start()
+
+    def capture(self, surface, rects=None):
+        """
+        Метод ставит кадр в очередь записи: копии областей rects экрана
+        surface или весь экран. Метод не ждет: если очередь заполнена
+        или запись остановлена ошибкой, кадр пропускается.
+        """
+        if self.frames.full() or self.error is not None:
+            self.dropped += 1
+            self.full = True
+            return
+        area = surface.get_rect()
+        if self.full or rects is None or any(
+                rect.contains(area) for rect in rects):
+            rects = [area]
+        regions = []
+        for rect in rects:
+            rect = rect.clip(area)
+            if rect.width and rect.height:
+                regions.append((surface.subsurface(rect).copy(), rect))
+        # Очередь пополняет только главный цикл, место в ней есть
+        self.frames.put_nowait((area.size, regions))
+        self.full = False
+
+    def encode(self):
+        """Метод потока: собирает кадры из областей и отдает приемнику."""
+        canvas = None
+        while True:
+            frame = self.frames.get()
+            if frame is None:
+                return
+            if self.error is not None:
+                continue
+            size, regions = frame
+            if canvas is None or canvas.get_size() != size:
+                canvas = pg.Surface(size)
+            canvas.blits(regions, False)
+            try:
+                self.sink.write(canvas)
+            except Exception as error:
+                self.error = error
+
+    def close(self):
+        """
+        Метод дожидается записи кадров из очереди и закрывает приемник.
+        Если запись остановилась с ошибкой, она выбрасывается здесь.
+        """
+        self.frames.put(None)
+        self.thread.join()
+        self.sink.close()
+        if self.error is not None:
+            raise self.error
@@ -0,0 +1,1169 @@
+"""
+Игровой движок Змейки: правила игры без pygame и без отрисовки.
+
+Модуль можно импортировать в рабочих процессах и ботах — он не открывает
+окно и не ограничивает частоту шагов. Отрисовка находится в `the_snake.py`.
+"""
+import random
+from collections import deque
+
+# Константы для размеров поля и сетки:
+SCREEN_WIDTH, SCREEN_HEIGHT = 640, 480
+GRID_SIZE = 20
+GRID_WIDTH = SCREEN_WIDTH // GRID_SIZE
+GRID_HEIGHT = SCREEN_HEIGHT // GRID_SIZE
+SCREEN_MIDDLE = ((SCREEN_WIDTH // 2), (SCREEN_HEIGHT // 2))
+
+# Направления движения:
+UP = (0, -1)
+DOWN = (0, 1)
+LEFT = (-1, 0)
+RIGHT = (1, 0)
+
+# Все направления по порядку - номер направления в этом кортеже служит
+# кодом действия для ботов
+DIRECTIONS = (UP, DOWN, LEFT, RIGHT)
+
+# Противоположные направления - змейка не может развернуться на месте
+OPPOSITE_DIRECTIONS = {UP: DOWN, DOWN: UP, LEFT: RIGHT, RIGHT: LEFT}
+
+# Сколько поворотов может ждать своего тика в очереди ввода змейки
+TURN_QUEUE_SIZE = 3
+
+# Константы цветов:
+BLACK = (0, 0, 0)
+RED = (255, 0, 0)
+LIGHTBLUE = (93, 216, 228)
+PURPLE = (128, 0, 128)
+GREY = (120, 120, 120)
+GREEN = (0, 255, 0)
+
+# Константы цветов игровых объектов
+BOARD_BACKGROUND_COLOR = BLACK
+BORDER_COLOR = LIGHTBLUE
+APPLE_COLOR = RED
+FIG_COLOR = PURPLE
+WALL_COLOR = GREY
+SNAKE_COLOR = GREEN
+
+# Скорость движения змейки:
+SPEED = 20
+
+# Уровни сложности: скорость игры, количество инжиров и стен.
+# Главный цикл игры переключается между уровнями по этой таблице.
+DIFFICULTY_LEVELS = {
+    1: {'speed': SPEED - 10, 'figs': 1, 'walls': 0},
+    2: {'speed': SPEED, 'figs': 3, 'walls': 1},
+}
+
+# Причины гибели змейки:
+CRASH_SELF = 'self'
+CRASH_WALL = 'wall'
+
+# Слои занятости клеток по видам объектов - номер слоя служит номером
+# плоскости в FreeCells.planes и номером бита в маске FreeCells.cell_layers
+SNAKE_LAYER, APPLE_LAYER, FIG_LAYER, WALL_LAYER = LAYERS = range(4)
+
+# Плоскости клеток в общем буфере FreeCells.planes: слои занятости
+# и за ними плоскость голов змеек
+HEAD_PLANE = len(LAYERS)
+PLANES = range(HEAD_PLANE + 1)
+
+# Направления и сдвиги к соседней клетке в пикселях
+NEIGHBOUR_MOVES = tuple((direction, direction[0] * GRID_SIZE,
+                         direction[1] * GRID_SIZE) for direction in DIRECTIONS)
+
+# Поле до стольких клеток хранит перестановку свободных клеток плоскими
+# списками, а плоскости - плоским буфером байт; большее - словарями только
+# тех клеток, которые посещали объекты
+DENSE_CELLS = 1 << 16
+
+# Общие для всех партий таблицы номеров клеток небольших полей по размерам
+# поля: (номера клеток, клетки по номерам, тождественная перестановка)
+_DENSE_BOARDS = {}
+
+
+def dense_board(board_size):
+    """
+    Функция возвращает таблицы номеров клеток поля board_size. Таблицы
+    строятся один раз на размер поля и не меняются: их делят все партии.
+    """
+    tables = _DENSE_BOARDS.get(board_size)
+    if tables is None:
+        columns, rows = board_size
+        cells = [(x * GRID_SIZE, y * GRID_SIZE)
+                 for x in range(columns) for y in range(rows)]
+        numbers = {cell: number for number, cell in enumerate(cells)}
+        tables = _DENSE_BOARDS[board_size] = (
+            numbers, cells, list(range(len(cells))))
+    return tables
+
+
+class SparseBoard:
+    """
+    Номера клеток большого поля: считаются по координатам, а не хранятся
+    таблицей. Повторяет нужную индексу часть интерфейса таблиц dense_board:
+    get(клетка) - номер или None, [номер] - клетка.
+    """
+
+    __slots__ = ('rows', 'width', 'height')
+
+    def __init__(self, board_size):
+        """Метод инициализации номеров поля board_size."""
+        columns, self.rows = board_size
+        self.width = columns * GRID_SIZE
+        self.height = self.rows * GRID_SIZE
+
+    def get(self, cell):
+        """Метод возвращает номер клетки или None для клетки вне поля."""
+        x, y = cell
+        if (x % GRID_SIZE or y % GRID_SIZE
+                or not 0 <= x < self.width or not 0 <= y < self.height):
+            return None
+        return x // GRID_SIZE * self.rows + y // GRID_SIZE
+
+    def __getitem__(self, number):
+        """Метод возвращает клетку по ее номеру."""
+        x, y = divmod(number, self.rows)
+        return x * GRID_SIZE, y * GRID_SIZE
+
+
+class SparsePermutation(dict):
+    """
+    Словарь перестановки большого поля: позиция без записи стоит на своем
+    месте. Записи, вернувшиеся на место, удаляются.
+    """
+
+    __slots__ = ()
+
+    def __missing__(self, key):
+        """Позиция без записи отображается сама в себя."""
+        return key
+
+    def __setitem__(self, key, value):
+        """Метод записывает позицию, вернувшуюся на место - удаляет."""
+        if key != value:
+            super().__setitem__(key, value)
+        else:
+            self.pop(key, None)
+
+
+class SparseCounts(dict):
+    """
+    Словарь счетчиков с нулем по умолчанию - плоскости большого поля.
+    Обнулившиеся счетчики удаляются, поэтому словарь хранит только клетки,
+    занятые сейчас.
+    """
+
+    __slots__ = ()
+
+    def __missing__(self, key):
+        """Отсутствующий счетчик равен нулю."""
+        return 0
+
+    def __setitem__(self, key, value):
+        """Метод записывает счетчик, нулевой - удаляет."""
+        if value:
+            super().__setitem__(key, value)
+        else:
+            self.pop(key, None)
+
+
+class FreeCells:
+    """
+    Индекс свободных клеток поля.
+    Клетки поля пронумерованы (x * rows + y) и разложены в перестановку:
+    первые size позиций занимают свободные клетки, остальные - занятые.
+    Занятие клетки - обмен с последней свободной, освобождение - обмен
+    с первой занятой. Выбор случайной свободной клетки стоит O(1) при любой
+    заполненности поля. На поле до DENSE_CELLS клеток перестановка и обратная
+    к ней - плоские списки, а номера клеток берутся из общих таблиц
+    dense_board: так занятие и освобождение клетки не дороже, чем в списке
+    свободных клеток. На большем поле хранятся только позиции, где
+    перестановка отличается от тождественной (SparsePermutation), а номера
+    считаются по координатам (SparseBoard), поэтому память растет с числом
+    клеток, которые посещали объекты, а не с размером поля. Одну клетку
+    могут занимать несколько объектов, поэтому для занятых клеток хранится
+    счетчик. Клетки вне поля индекс учитывает, но никогда не выдает
+    свободными.
+    Для проверок столкновений индекс ведет слои занятости: по плоскости байт
+    на каждый вид объектов (LAYERS), в байте клетки - сколько объектов
+    слоя ее занимают. Проверка "в клетке стена" - одно обращение к буферу,
+    свободные соседи клетки (free_neighbours) - по обращению на соседа
+    и слой.
+    Какой именно объект слоя стоит в клетке, хранит словарь owners слоя:
+    поиск съеденного инжира не зависит от количества инжиров. Если объекты
+    одного слоя накладываются, клетка числится за последним из них.
+    Слои и плоскость голов змеек (HEAD_PLANE) лежат подряд в одном буфере
+    planes: счетчик клетки number плоскости plane - planes[plane * area
+    + number]. На поле до DENSE_CELLS клеток буфер - bytearray на все
+    клетки, его наблюдения для агентов (snake_observation) читают без
+    копирования. На большем поле буфер - SparseCounts только с занятыми
+    клетками.
+    """
+
+    __slots__ = ('rng', 'board_size', 'columns', 'rows', 'area', 'width',
+                 'height', 'size', 'numbers', 'board_cells', 'order',
+                 'places', 'counts', 'planes', 'owners', 'version')
+
+    def __init__(self, occupied_cells=(), rng=None,
+                 board_size=(GRID_WIDTH, GRID_HEIGHT)):
+        """
+        Метод инициализации индекса: все клетки поля, кроме занятых.
+        Атрибут rng - генератор случайных чисел партии, по умолчанию общий
+        генератор модуля random.
+        Атрибут board_size - размер поля в клетках, width и height -
+        в пикселях.
+        Атрибут area - число клеток поля, numbers - номера клеток
+        (numbers.get(клетка)), board_cells - клетки по номерам, planes -
+        буфер плоскостей PLANES по номерам клеток, owners - объекты слоев
+        по клеткам.
+        Атрибут version растет, когда еда или стены занимают или освобождают
+        клетки: по нему можно не сравнивать сами клетки.
+        """
+        self.rng = random if rng is None else rng
+        self.columns, self.rows = board_size
+        self.width = self.columns * GRID_SIZE
+        self.height = self.rows * GRID_SIZE
+        self.area = self.size = self.columns * self.rows
+        self._attach_board(board_size)
+        # Позиция в перестановке -> номер клетки и обратно
+        self.order, self.places = self._identity()
+        self.counts = {}
+        if self.area <= DENSE_CELLS:
+            self.planes = bytearray(len(PLANES) * self.area)
+        else:
+            self.planes = SparseCounts()
+        self.owners = [{} for _ in LAYERS]
+        self.version = 0
+        for cell in occupied_cells:
+            self.occupy(cell)
+
+    def _attach_board(self, board_size):
+        """Метод подключает номера клеток поля board_size."""
+        self.board_size = board_size
+        if self.area <= DENSE_CELLS:
+            self.numbers, self.board_cells, _ = dense_board(board_size)
+        else:
+            self.numbers = self.board_cells = SparseBoard(board_size)
+
+    def _identity(self):
+        """Метод возвращает тождественные перестановку и обратную к ней."""
+        if self.area <= DENSE_CELLS:
+            identity = dense_board(self.board_size)[2]
+            return identity[:], identity[:]
+        return SparsePermutation(), SparsePermutation()
+
+    def __getstate__(self):
+        """
+        Копирование и pickle не копируют общие таблицы номеров клеток:
+        после восстановления индекс подключает их заново по размеру поля.
+        """
+        return {name: getattr(self, name) for name in self.__slots__
+                if name not in ('numbers', 'board_cells')}
+
+    def __setstate__(self, state):
+        """Метод восстанавливает индекс и подключает номера клеток."""
+        for name, value in state.items():
+            setattr(self, name, value)
+        self._attach_board(self.board_size)
+
+    def __len__(self):
+        """Количество свободных клеток."""
+        return self.size
+
+    def __contains__(self, cell):
+        """Проверка, свободна ли клетка."""
+        number = self.numbers.get(cell)
+        if number is None:
+            return False
+        return self.places[number] < self.size
+
+    @property
+    def cells(self):
+        """Список свободных клеток в порядке индекса, строится за O(size)."""
+        return [self.board_cells[self.order[i]] for i in range(self.size)]
+
+    def moved(self):
+        """
+        Метод возвращает пары (позиция, клетка) перестановки, где клетка
+        стоит не на своем месте, по возрастанию позиций.
+        """
+        if isinstance(self.order, SparsePermutation):
+            return sorted(self.order.items())
+        return [(i, number) for i, number in enumerate(self.order)
+                if i != number]
+
+    def restore_order(self, moved):
+        """Метод собирает перестановку заново по парам метода moved."""
+        self.order, self.places = self._identity()
+        for i, number in moved:
+            self.order[i] = number
+            self.places[number] = i
+
+    def cell_number(self, cell):
+        """Метод возвращает номер клетки или None для клетки вне поля."""
+        return self.numbers.get(cell)
+
+    def number_cell(self, number):
+        """Метод возвращает клетку по ее номеру."""
+        return self.board_cells[number]
+
+    def occupy(self, cell, layer=None, owner=None):
+        """
+        Метод отмечает клетку занятой еще одним объектом, объектом owner
+        слоя layer, если они заданы.
+        """
+        # Самый частый путь движка: обмен в перестановке записан прямо
+        # здесь, без вызовов вспомогательных методов
+        counts = self.counts
+        count = counts.get(cell, 0)
+        counts[cell] = count + 1
+        number = self.numbers.get(cell)
+        if number is None:
+            return
+        if layer is not None:
+            self.planes[layer * self.area + number] += 1
+            if owner is not None:
+                self.owners[layer][cell] = owner
+        places = self.places
+        i = places[number]
+        last = self.size - 1
+        if count == 0 and i <= last:
+            # Последняя свободная клетка встает на место занятой
+            order = self.order
+            other = order[last]
+            order[last] = number
+            places[number] = last
+            order[i] = other
+            places[other] = i
+            self.size = last
+
+    def release(self, cell, layer=None, owner=None):
+        """Метод освобождает клетку от одного из занимающих ее объектов."""
+        counts = self.counts
+        count = counts[cell] - 1
+        number = self.numbers.get(cell)
+        if layer is not None and number is not None:
+            self.planes[layer * self.area + number] -= 1
+            owners = self.owners[layer]
+            if owner is not None and owners.get(cell) is owner:
+                del owners[cell]
+        if count:
+            counts[cell] = count
+            return
+        del counts[cell]
+        if number is not None:
+            # Клетка встает на место первой занятой
+            order, places = self.order, self.places
+            first = self.size
+            i = places[number]
+            other = order[first]
+            order[first] = number
+            places[number] = first
+            order[i] = other
+            places[other] = i
+            self.size = first + 1
+
+    def mark(self, plane, cell, step=1):
+        """
+        Метод меняет на step счетчик клетки в плоскости plane. Клетки вне
+        поля в плоскостях не учитываются.
+        """
+        number = self.numbers.get(cell)
+        if number is not None:
+            self.planes[plane * self.area + number] += step
+
+    def move_head(self, old, new):
+        """
+        Метод переносит отметку головы змейки из клетки old в клетку new.
+        None вместо клетки - у змейки не было или не стало головы.
+        """
+        # Голова переносится на каждом ходу змейки, поэтому отметки
+        # записаны здесь, а не через mark
+        numbers, planes = self.numbers, self.planes
+        heads = HEAD_PLANE * self.area
+        number = None if old is None else numbers.get(old)
+        if number is not None:
+            planes[heads + number] -= 1
+        number = None if new is None else numbers.get(new)
+        if number is not None:
+            planes[heads + number] += 1
+
+    def occupied_by(self, cell, layer):
+        """Проверка, занимают ли клетку объекты слоя layer."""
+        number = self.numbers.get(cell)
+        return (number is not None
+                and self.planes[layer * self.area + number] > 0)
+
+    def cell_layers(self, cell):
+        """
+        Метод возвращает маску слоев, занимающих клетку: бит 1 << слой
+        установлен, если в клетке есть объекты этого слоя.
+        """
+        number = self.numbers.get(cell)
+        if number is None:
+            return 0
+        return sum(1 << layer for layer in LAYERS
+                   if self.planes[layer * self.area + number])
+
+    def free_neighbours(self, cell, layers):
+        """
+        Метод возвращает пары (направление, соседняя клетка) для соседей
+        клетки cell с переходом через край поля, не занятых объектами
+        слоев layers.
+        """
+        numbers, planes = self.numbers, self.planes
+        width, height = self.width, self.height
+        offsets = [layer * self.area for layer in layers]
+        x, y = cell
+        pairs = []
+        for direction, dx, dy in NEIGHBOUR_MOVES:
+            following = ((x + dx) % width, (y + dy) % height)
+            number = numbers.get(following)
+            if number is not None:
+                for offset in offsets:
+                    if planes[offset + number]:
+                        break
+                else:
+                    pairs.append((direction, following))
+        return pairs
+
+    def clear_layers(self):
+        """Метод обнуляет слои, головы и объекты слоев в занятых клетках."""
+        for owners in self.owners:
+            owners.clear()
+        for cell in self.counts:
+            number = self.numbers.get(cell)
+            if number is not None:
+                for plane in PLANES:
+                    self.planes[plane * self.area + number] = 0
+
+    def sample(self):
+        """Метод возвращает случайную свободную клетку или None."""
+        if not self.size:
+            return None
+        return self.board_cells[self.order[self.rng.randrange(self.size)]]
+
+
+class GameObject:
+    """Базовый класс, на его основании созданы остальные."""
+
+    # Объекты движка хранят атрибуты в __slots__, без словаря экземпляра:
+    # в одном процессе могут идти тысячи партий
+    __slots__ = ('body_color', 'position')
+
+    def __init__(
+        self, object_color=None, object_position=SCREEN_MIDDLE
+    ) -> None:
+        """
+        Метод инициации объекта. Базовые атрибуты - цвет (body_color)
+        и позиция (position) объекта.
+        """
+        self.body_color = object_color
+        self.position = object_position
+
+    def draw(self):
+        """Заготовка под наследуемый метод."""
+        raise NotImplementedError(
+            f'{self.__class__.__name__} object method is not implemented')
+
+
+class SnakeBody(deque):
+    """
+    Тело змейки - очередь клеток от головы к хвосту.
+    Вместе с очередью хранится словарь занятости клеток, поэтому добавление
+    головы, удаление хвоста и проверка "клетка занята змейкой" стоят O(1).
+    В индексе free_cells тело отмечает и свою голову.
+    """
+
+    __slots__ = ('cells', 'free_cells')
+
+    layer = SNAKE_LAYER
+
+    def __init__(self, positions=(), free_cells=None):
+        """
+        Метод инициализации тела из последовательности клеток.
+        Если передан индекс free_cells, тело само отмечает в нем свои клетки.
+        """
+        super().__init__()
+        self.cells = {}
+        self.free_cells = free_cells
+        self.extend(positions)
+
+    def _occupy(self, position):
+        """Метод отмечает клетку занятой."""
+        self.cells[position] = self.cells.get(position, 0) + 1
+        if self.free_cells is not None:
+            self.free_cells.occupy(position, self.layer)
+
+    def _release(self, position):
+        """Метод освобождает клетку, если ее больше не занимает змейка."""
+        if self.cells[position] == 1:
+            del self.cells[position]
+        else:
+            self.cells[position] -= 1
+        if self.free_cells is not None:
+            self.free_cells.release(position, self.layer)
+
+    def _head(self):
+        """Метод возвращает голову или None для пустого тела."""
+        return deque.__getitem__(self, 0) if self else None
+
+    def _move_head(self, head):
+        """Метод переносит отметку головы в индексе, если голова сменилась."""
+        new = self._head()
+        if self.free_cells is not None and new != head:
+            self.free_cells.move_head(head, new)
+
+    def __reduce__(self):
+        """
+        Копирование и pickle пересобирают словарь занятости заново, а индекс
+        подключают после сборки: клетки тела в нем уже отмечены.
+        """
+        return self.__class__, (list(self),), self.free_cells
+
+    def __setstate__(self, free_cells):
+        """Метод подключает индекс свободных клеток к собранному телу."""
+        self.free_cells = free_cells
+
+    def __eq__(self, other):
+        """Тело можно сравнивать и с очередью, и со списком клеток."""
+        if isinstance(other, list):
+            return list(self) == other
+        return super().__eq__(other)
+
+    __hash__ = None
+
+    def __contains__(self, position):
+        """Проверка занятости клетки змейкой за O(1)."""
+        return position in self.cells
+
+    def __getitem__(self, index):
+        """Доступ по индексу, срез возвращает список - как у старого списка."""
+        if isinstance(index, slice):
+            return list(self)[index]
+        return super().__getitem__(index)
+
+    def __setitem__(self, index, position):
+        """Замена клетки по индексу."""
+        head = self._head()
+        self._release(super().__getitem__(index))
+        super().__setitem__(index, position)
+        self._occupy(position)
+        self._move_head(head)
+
+    def __delitem__(self, index):
+        """Удаление клетки по индексу."""
+        head = self._head()
+        self._release(super().__getitem__(index))
+        super().__delitem__(index)
+        self._move_head(head)
+
+    def __iadd__(self, positions):
+        """Добавление клеток в конец через +=."""
+        self.extend(positions)
+        return self
+
+    def count(self, position):
+        """Метод возвращает, сколько раз клетка входит в тело, за O(1)."""
+        return self.cells.get(position, 0)
+
+    def append(self, position):
+        """Метод добавляет клетку в хвост."""
+        super().append(position)
+        self._occupy(position)
+        if self.free_cells is not None and len(self) == 1:
+            self.free_cells.move_head(None, position)
+
+    def appendleft(self, position):
+        """Метод добавляет новую голову."""
+        head = deque.__getitem__(self, 0) if self else None
+        super().appendleft(position)
+        self._occupy(position)
+        if self.free_cells is not None:
+            self.free_cells.move_head(head, position)
+
+    def extend(self, positions):
+        """Метод добавляет клетки в хвост."""
+        for position in positions:
+            self.append(position)
+
+    def extendleft(self, positions):
+        """Метод добавляет клетки со стороны головы."""
+        for position in positions:
+            self.appendleft(position)
+
+    def insert(self, index, position):
+        """Метод вставляет клетку, вставка в начало стоит O(1)."""
+        head = self._head()
+        super().insert(index, position)
+        self._occupy(position)
+        self._move_head(head)
+
+    def pop(self):
+        """Метод убирает и возвращает клетку хвоста."""
+        position = super().pop()
+        self._release(position)
+        if self.free_cells is not None and not self:
+            self.free_cells.move_head(position, None)
+        return position
+
+    def popleft(self):
+        """Метод убирает и возвращает клетку головы."""
+        position = super().popleft()
+        self._release(position)
+        if self.free_cells is not None:
+            self.free_cells.move_head(position, self._head())
+        return position
+
+    def remove(self, position):
+        """Метод убирает первое вхождение клетки."""
+        head = self._head()
+        super().remove(position)
+        self._release(position)
+        self._move_head(head)
+
+    def clear(self):
+        """Метод очищает тело змейки."""
+        if self.free_cells is not None:
+            self.free_cells.move_head(self._head(), None)
+            for position in self:
+                self.free_cells.release(position, self.layer)
+        super().clear()
+        self.cells.clear()
+
+
+class Snake(GameObject):
+    """Класс отвечающий за поведение объекта змейки."""
+
+    __slots__ = ('board_width', 'board_height', 'turns', 'last',
+                 'dropped_tail', 'difficulty', 'free_cells', 'positions',
+                 'length', 'direction')
+
+    layer = SNAKE_LAYER
+
+    def __init__(
+            self, length=1,
+            object_position=SCREEN_MIDDLE,
+            direction=RIGHT,
+            next_direction=None,
+            body_color=SNAKE_COLOR,
+            free_cells=None,
+            board_size=(GRID_WIDTH, GRID_HEIGHT)
+    ):
+        """
+        Метод инициации экземпяра класса змейки.
+        Атрибут length - максимальная длина змейки в данный момент
+        Атрибут direction - направление змейки
+        Атрибут turns - очередь поворотов ввода, поворот next_direction
+        ставится в нее первым
+        Атрибут last - для закрашивания последней клетки при движении
+        Атрибут dropped_tail - все клетки хвоста, убранные за последний ход
+        Атрибут difficulty - текущий уровень сложности игры, влияет на наличие
+        стены, скорость игры и количество инжиров
+        Атрибут free_cells - общий индекс свободных клеток поля (если есть)
+        Атрибуты board_width и board_height - размер поля в пикселях,
+        через его край змейка переходит на другую сторону
+        """
+        super().__init__(body_color, object_position)
+        self.board_width = board_size[0] * GRID_SIZE
+        self.board_height = board_size[1] * GRID_SIZE
+        # Очередь поворотов короткая, список в ней компактнее deque
+        self.turns = []
+        self.last = None
+        self.dropped_tail = []
+        self.difficulty = 1
+        self.free_cells = free_cells
+        self.positions = SnakeBody(free_cells=free_cells)
+        self.reset()
+        if next_direction is not None:
+            self.turn(next_direction)
+
+    def delete_dropped_tail(self):
+        """Метод удаляет последнюю клетку хвоста и запоминает ее."""
+        self.dropped_tail.append(self.positions.pop())
+
+    def turn(self, direction):
+        """
+        Метод ставит поворот в очередь ввода - змейка повернет в одном
+        из следующих тиков. Нажатия сверх TURN_QUEUE_SIZE отбрасываются.
+        """
+        if len(self.turns) < TURN_QUEUE_SIZE:
+            self.turns.append(direction)
+
+    def is_valid_turn(self, direction):
+        """Проверка, что поворот меняет направление и это не разворот."""
+        return direction not in (self.direction,
+                                 OPPOSITE_DIRECTIONS[self.direction])
+
+    def next_turn(self):
+        """
+        Метод возвращает направление, которое змейка примет в следующем
+        тике, не трогая очередь ввода.
+        """
+        for direction in self.turns:
+            if self.is_valid_turn(direction):
+                return direction
+        return self.direction
+
+    def update_direction(self):
+        """
+        Метод для обновления направления змейки в начале тика: применяет
+        не больше одного поворота из очереди ввода. Повороты, которые
+        сейчас ничего не меняют или разворачивают змейку, отбрасываются,
+        остальные ждут следующих тиков.
+        """
+        while self.turns:
+            direction = self.turns.pop(0)
+            if self.is_valid_turn(direction):
+                self.direction = direction
+                return
+
+    def move(self):
+        """
+        Метод реализует логику движения змейки
+        и перехода через край поля.
+        """
+        head_x, head_y = self.positions[0]
+        dx, dy = self.direction
+        positions = self.positions
+        # Добавляем новую голову змейки в начало очереди
+        positions.appendleft(((head_x + GRID_SIZE * dx) % self.board_width,
+                              (head_y + GRID_SIZE * dy) % self.board_height))
+        # Запоминаем клетки хвоста, которые предстоит стереть: список
+        # переиспользуется между ходами
+        dropped_tail = self.dropped_tail
+        dropped_tail.clear()
+        while len(positions) > self.length:
+            dropped_tail.append(positions.pop())
+        self.last = dropped_tail[0] if dropped_tail else None
+
+    def get_head_position(self):
+        """Метод возвращает позицию головы змейки."""
+        return self.positions[0]
+
+    def get_cells(self):
+        """Метод возвращает клетки, которые занимает змейка."""
+        return self.positions
+
+    def reset(self):
+        """Метод возвращает змейку к исходному состоянию."""
+        self.turns.clear()
+        self.positions.clear()
+        self.positions.append(self.position)
+        self.length = 1
+        self.direction = RIGHT
+
+
+class Apple(GameObject):
+    """Класс Яблока - полезная еда, увеличивающая длину змейки на 1."""
+
+    __slots__ = ('free_cells', 'placed')
+
+    layer = APPLE_LAYER
+
+    def __init__(self, color=APPLE_COLOR, occupied_cells=None,
+                 free_cells=None):
+        """
+        Метод инициализации экземпляра класса.
+        Атрибут free_cells - общий индекс свободных клеток поля. Если он
+        задан, объект выбирает клетку по нему и сам отмечает в нем свои клетки.
+        """
+        if occupied_cells is None:
+            occupied_cells = []
+        super().__init__(color)
+        self.free_cells = free_cells
+        self.placed = False
+        self.randomize_position(occupied_cells=occupied_cells)
+
+    def get_cells(self):
+        """Метод возвращает клетки, которые занимает объект."""
+        return (self.position,)
+
+    def remove_from_board(self):
+        """Метод освобождает клетки объекта в индексе свободных клеток."""
+        if self.placed and self.free_cells is not None:
+            for cell in self.get_cells():
+                self.free_cells.release(cell, self.layer, self)
+            self.free_cells.version += 1
+        self.placed = False
+
+    def randomize_position(self, occupied_cells=[SCREEN_MIDDLE]):
+        """
+        Метод переносит объект на случайную свободную клетку поля.
+        Без общего индекса свободные клетки считаются по occupied_cells.
+        Если свободных клеток нет, объект остается на месте.
+        """
+        if self.free_cells is None:
+            cell = FreeCells(occupied_cells).sample()
+        else:
+            self.remove_from_board()
+            cell = self.free_cells.sample()
+        self.place(cell)
+
+    def place(self, cell):
+        """
+        Метод переносит объект в клетку cell и отмечает его клетки в индексе
+        свободных клеток. При cell=None объект остается на месте.
+        """
+        self.remove_from_board()
+        if cell is not None:
+            self.set_position(cell)
+        if self.free_cells is not None:
+            for cell in self.get_cells():
+                self.free_cells.occupy(cell, self.layer, self)
+            self.free_cells.version += 1
+        self.placed = True
+
+    def set_position(self, position):
+        """Метод ставит объект в заданную клетку."""
+        self.position = position
+
+
+class Fig(Apple):
+    """Класс Инжир - вредная еда, уменьшающая длину змейки на 1."""
+
+    __slots__ = ()
+
+    layer = FIG_LAYER
+
+    def __init__(self, color=FIG_COLOR, occupied_cells=None,
+                 free_cells=None):
+        """Метод инициализации экземпляра класса."""
+        super().__init__(color, occupied_cells, free_cells)
+
+
+class StoneWall(Apple):
+    """Класс каменная стена - препятствие, при столкновении обнуляет игру."""
+
+    __slots__ = ('direction', 'positions')
+
+    layer = WALL_LAYER
+
+    def __init__(self, color=WALL_COLOR, occupied_cells=None,
+                 free_cells=None):
+        """Метод инициализации экземпляра класса."""
+        self.free_cells = free_cells
+        # Выбираем случайное направление стены
+        self.choose_direction()
+        super().__init__(color, occupied_cells, free_cells)
+
+    def choose_direction(self):
+        """Выбираем случайное направление для стены в координатах поля."""
+        rng = random if self.free_cells is None else self.free_cells.rng
+        if rng.randrange(1, 3) > 1:
+            self.direction = DOWN
+        else:
+            self.direction = RIGHT
+
+    def get_cells(self):
+        """Метод возвращает клетки стены."""
+        return self.positions
+
+    def set_position(self, position):
+        """
+        Метод ставит начало стены в заданную клетку и удлинняет стену
+        в выбранном направлении, переходя через край поля как змейка.
+        """
+        if self.free_cells is None:
+            width, height = SCREEN_WIDTH, SCREEN_HEIGHT
+        else:
+            width, height = self.free_cells.width, self.free_cells.height
+        self.position = position
+        self.positions = [
+            ((position[0] + self.direction[0] * GRID_SIZE * i) % width,
+             (position[1] + self.direction[1] * GRID_SIZE * i) % height)
+            for i in range(9)]
+
+
+class LevelMap(StoneWall):
+    """
+    Класс неподвижной карты уровня из пакета уровней (snake_levels):
+    стены карты (positions) и клетки, где не появляется еда (reserved).
+    Клетки считаются при загрузке пакета, карта только отмечает их
+    в индексе свободных клеток и не двигается до смены уровня.
+    """
+
+    __slots__ = ('reserved',)
+
+    def __init__(self, color=WALL_COLOR, cells=(), reserved=(),
+                 free_cells=None):
+        """Метод инициализации карты с готовыми клетками."""
+        GameObject.__init__(self, color,
+                            cells[0] if cells else SCREEN_MIDDLE)
+        self.free_cells = free_cells
+        self.direction = RIGHT
+        self.positions = cells
+        self.reserved = reserved
+        self.placed = False
+        self.place(None)
+
+    def remove_from_board(self):
+        """Метод освобождает клетки стен и клетки без еды в индексе."""
+        if self.placed and self.free_cells is not None:
+            for cell in self.reserved:
+                self.free_cells.release(cell)
+        super().remove_from_board()
+
+    def place(self, cell):
+        """Метод отмечает клетки карты в индексе, карта остается на месте."""
+        super().place(None)
+        if self.free_cells is not None:
+            for cell in self.reserved:
+                self.free_cells.occupy(cell)
+
+
+def layer_occupied(cell, objects, layer):
+    """
+    Проверка, занята ли клетка объектами слоя layer: по слою общего индекса
+    свободных клеток, а без индекса - перебором клеток объектов objects.
+    """
+    free_cells = objects[0].free_cells if objects else None
+    if free_cells is None:
+        return any(cell in game_object.get_cells() for game_object in objects)
+    return free_cells.occupied_by(cell, layer)
+
+
+def find_object(cell, objects, layer):
+    """
+    Функция возвращает объект слоя layer в клетке или None: по индексу
+    объектов общего индекса свободных клеток, а без индекса - перебором
+    объектов objects.
+    """
+    free_cells = objects[0].free_cells if objects else None
+    if free_cells is None:
+        return next((game_object for game_object in objects
+                     if cell in game_object.get_cells()), None)
+    return free_cells.owners[layer].get(cell)
+
+
+def check_figs(snake, figs):
+    """Вспомогательная функция для цикла игры, проверяет поедание инжира."""
+    fig = find_object(snake.get_head_position(), figs, FIG_LAYER)
+    if fig is not None:
+        if snake.length > 1:
+            snake.length -= 1
+        fig.randomize_position(snake.positions)
+
+
+def check_wall_bump(snake, *stone_walls):
+    """
+    Функция проверки столкновения со стенами.
+    Возвращает True, если змейка разбилась и была сброшена.
+    """
+    if layer_occupied(snake.get_head_position(), stone_walls, WALL_LAYER):
+        snake.reset()
+        return True
+    return False
+
+
+def get_occupied_positions(*args):
+    """Функция возвращает список занятых в данный момент клеток."""
+    res = []
+    for object in args:
+        if hasattr(object, 'positions'):
+            res += object.positions
+        elif object is None:
+            continue
+        elif isinstance(object, tuple):
+            res.append(object)
+        elif isinstance(object, list):
+            res += get_occupied_positions(*object)
+        else:
+            res.append(object.position)
+    return res
+
+
+def check_snake_events(snake, apple, *objects):
+    """
+    Функция проверяет столкновение с собой и поедание яблока.
+    Возвращает True, если змейка столкнулась с собой и была сброшена.
+    """
+    head = snake.get_head_position()
+    if head == apple.position:
+        snake.length += 1
+        # Список занятых клеток нужен, только если нет общего индекса
+        if apple.free_cells is None:
+            apple.randomize_position(occupied_cells=get_occupied_positions(
+                snake, *objects))
+        else:
+            apple.randomize_position()
+        # Проверка "Столкнулись с собой": голова попала на клетку тела
+    elif snake.positions.count(head) > 1:
+        snake.reset()
+        return True
+    return False
+
+
+class Game:
+    """
+    Класс партии без окна: змейка, еда и препятствия текущей сложности.
+    Шаг партии выполняется методом step так быстро, как позволяет процессор.
+    Классы объектов заданы атрибутами класса, чтобы интерфейс с отрисовкой
+    мог подставить свои.
+    """
+
+    # Ссылка __weakref__ нужна автопилотам, которые хранятся по партиям
+    __slots__ = ('ticks', 'score', 'crash_cause', 'next_difficulty', 'seed',
+                 'rng', 'board_size', 'free_cells', 'snake', 'apple', 'figs',
+                 'walls', 'level_map', 'obstacles', 'objects', 'levels',
+                 'start', 'difficulty', 'speed', '__weakref__')
+
+    snake_class = Snake
+    apple_class = Apple
+    fig_class = Fig
+    stone_wall_class = StoneWall
+    level_map_class = LevelMap
+
+    def __init__(self, difficulty=1, seed=None,
+                 board_size=(GRID_WIDTH, GRID_HEIGHT), levels=None):
+        """
+        Метод инициализации партии.
+        Атрибут rng - свой генератор случайных чисел партии: при одинаковом
+        seed партия раскладывает еду и стены одинаково. Без seed он выбирается
+        случайно и сохраняется в атрибуте seed, чтобы партию можно было
+        повторить.
+        Атрибут next_difficulty - уровень сложности, выбранный игроком,
+        применяется в следующем тике.
+        Атрибут free_cells - общий индекс свободных клеток для всех объектов,
+        figs и walls - списки инжиров и стен уровня, level_map - неподвижная
+        карта уровня или None, obstacles - стены и карта вместе, objects -
+        все объекты поля, difficulty и speed - текущий уровень сложности
+        и его скорость.
+        Атрибут levels - таблица уровней сложности: DIFFICULTY_LEVELS или
+        пакет уровней, загруженный snake_levels.load_levels.
+        Атрибуты ticks и score - счетчики тиков и съеденных яблок,
+        crash_cause - причина гибели змейки на последнем тике или None.
+        Атрибут board_size - размер поля в клетках, змейка начинает
+        в его середине (start), если карта уровня не задает другую клетку.
+        """
+        self.ticks = 0
+        self.score = 0
+        self.crash_cause = None
+        self.next_difficulty = None
+        if seed is None:
+            seed = random.randrange(2 ** 64)
+        self.seed = seed
+        self.rng = random.Random(seed)
+        self.board_size = board_size
+        self.levels = DIFFICULTY_LEVELS if levels is None else levels
+        self.free_cells = FreeCells(rng=self.rng, board_size=board_size)
+        self.start = (board_size[0] // 2 * GRID_SIZE,
+                      board_size[1] // 2 * GRID_SIZE)
+        self.snake = self.snake_class(
+            object_position=self.start,
+            free_cells=self.free_cells, board_size=board_size)
+        self.apple = self.apple_class(free_cells=self.free_cells)
+        self.figs = []
+        self.walls = []
+        self.level_map = None
+        self.set_difficulty(difficulty)
+
+    @property
+    def board_version(self):
+        """
+        Номер расстановки еды, стен и карты уровня: растет при каждом их
+        переносе (FreeCells.version).
+        """
+        return self.free_cells.version
+
+    @property
+    def stone_wall(self):
+        """Первая стена уровня или None, если стен на уровне нет."""
+        return self.walls[0] if self.walls else None
+
+    def set_difficulty(self, difficulty):
+        """
+        Метод переключает уровень сложности по таблице levels: ставит карту
+        уровня, добавляет или убирает инжиры и стены, сбрасывает змейку.
+        """
+        level = self.levels[difficulty]
+        self.difficulty = difficulty
+        self.speed = level['speed']
+        self.snake.difficulty = difficulty
+        self.snake.position = level.get('spawn', self.start)
+        self.snake.reset()
+        self.set_level_map(level)
+        self.fill_level(self.figs, level['figs'], self.fig_class)
+        self.fill_level(self.walls, level['walls'], self.stone_wall_class)
+        self.obstacles = list(self.walls)
+        if self.level_map is not None:
+            self.obstacles.append(self.level_map)
+        self.objects = [self.snake, self.apple, *self.figs, *self.obstacles]
+
+    def set_level_map(self, level):
+        """
+        Метод ставит неподвижную карту уровня вместо прежней и переносит еду
+        с клеток, занятых картой. Клетки и маски карты посчитаны при загрузке
+        пакета уровней, поэтому смена карты - один проход по ее клеткам.
+        """
+        if self.level_map is not None:
+            self.level_map.remove_from_board()
+            self.level_map = None
+        if 'free_mask' not in level:
+            return
+        self.level_map = self.level_map_class(
+            cells=level['wall_cells'], reserved=level['reserved'],
+            free_cells=self.free_cells)
+        free_mask = level['free_mask']
+        for food in (self.apple, *self.figs):
+            if not free_mask[self.free_cells.cell_number(food.position)]:
+                food.randomize_position()
+
+    def fill_level(self, objects, count, object_class):
+        """
+        Метод убирает лишние объекты списка objects с поля или добавляет
+        новые объекты класса object_class, пока их не станет count.
+        """
+        while len(objects) > count:
+            objects.pop().remove_from_board()
+        while len(objects) < count:
+            objects.append(object_class(free_cells=self.free_cells))
+
+    def get_objects(self):
+        """
+        Метод возвращает все объекты на поле. Список собирается при смене
+        уровня, а не при каждом вызове.
+        """
+        return self.objects
+
+    def step(self, direction=None, difficulty=None):
+        """
+        Метод выполняет один тик игры: ход змейки и проверку событий.
+        Возвращает True, если змейка разбилась и была сброшена.
+        """
+        self.move_snake(direction, difficulty)
+        return self.check_events()
+
+    def move_snake(self, direction=None, difficulty=None):
+        """
+        Первая половина тика: выбор уровня сложности (difficulty или
+        next_difficulty), поворот и движение змейки.
+        """
+        self.ticks += 1
+        self.crash_cause = None
+        if difficulty is None:
+            difficulty = self.next_difficulty
+        self.next_difficulty = None
+        if difficulty is not None:
+            self.set_difficulty(difficulty)
+        if direction is not None:
+            self.snake.turn(direction)
+        self.snake.update_direction()
+        self.snake.move()
+
+    def check_events(self):
+        """
+        Вторая половина тика: поедание еды и столкновения.
+        Возвращает True, если змейка разбилась и была сброшена.
+        """
+        if self.snake.get_head_position() == self.apple.position:
+            self.score += 1
+        if check_snake_events(
+                self.snake, self.apple, self.walls, self.figs):
+            self.crash_cause = CRASH_SELF
+        check_figs(self.snake, self.figs)
+        if self.obstacles and check_wall_bump(self.snake, *self.obstacles):
+            self.crash_cause = CRASH_WALL
+        return self.crash_cause is not None
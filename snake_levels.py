@@ -0,0 +1,147 @@
+"""
+Пакеты уровней Змейки: уровни сложности из файла вместо таблицы
+DIFFICULTY_LEVELS.
+
+Пакет - файл INI, по секции на уровень, имя секции - номер уровня:
+
+    [2]
+    speed = 20
+    figs = 3
+    walls = 1
+    map =
+        ################################
+        #S.............................#
+        #------........................#
+        ...
+
+speed, figs и walls - скорость, количество инжиров и случайных стен, как
+в DIFFICULTY_LEVELS. Необязательная карта map - строки клеток поля сверху
+вниз: # - неподвижная стена, . - пустая клетка, - - клетка, где не появляется
+еда, S - клетка, с которой начинает змейка (без S - середина поля, как
+в Game). Карта меньше поля ложится в его левый верхний угол, остальные клетки
+поля пустые. Уровни 1 и 2 в пакете обязательны: их выбирает игрок.
+
+Маска карты (free_mask - клетки, где может появиться еда) и списки клеток
+стен и клеток без еды считаются один раз при загрузке пакета и кэшируются,
+поэтому смена уровня только отмечает готовые клетки в индексе свободных
+клеток, а в тике карта не стоит ничего.
+
+    python the_snake.py --levels levels/maze.ini
+"""
+import configparser
+import hashlib
+import os
+
+from snake_engine import GRID_HEIGHT, GRID_SIZE, GRID_WIDTH, SPEED
+
+# Клетки карты уровня
+MAP_WALL = '#'
+MAP_EMPTY = '.'
+MAP_NO_FOOD = '-'
+MAP_SPAWN = 'S'
+
+# Уровни, которые должны быть в каждом пакете: игра начинает с уровня 1,
+# клавиши 1 и 2 выбирают уровни 1 и 2
+REQUIRED_LEVELS = (1, 2)
+
+# Загруженные пакеты уровней по пути к файлу и размеру поля
+level_packs = {}
+
+# Отпечаток пакета уровней - начало SHA-256 его файла; нулевой отпечаток -
+# встроенная таблица DIFFICULTY_LEVELS
+PACK_DIGEST_SIZE = 8
+NO_PACK_DIGEST = bytes(PACK_DIGEST_SIZE)
+
+
+def parse_map(rows, board_size):
+    """
+    Функция разбирает строки карты уровня и возвращает маски стен и клеток
+    еды по номерам клеток (x * rows + y, как в FreeCells) и клетку начала
+    змейки или None. Клетка начала змейки (S или середина поля) не может
+    быть стеной.
+    """
+    columns, height = board_size
+    if len(rows) > height or any(len(row) > columns for row in rows):
+        raise ValueError('Карта уровня больше поля')
+    collision_mask = bytearray(columns * height)
+    free_mask = bytearray(b'\x01' * (columns * height))
+    spawn = None
+    for y, row in enumerate(rows):
+        for x, char in enumerate(row):
+            number = x * height + y
+            if char == MAP_WALL:
+                collision_mask[number] = 1
+                free_mask[number] = 0
+            elif char == MAP_NO_FOOD:
+                free_mask[number] = 0
+            elif char == MAP_SPAWN:
+                spawn = (x * GRID_SIZE, y * GRID_SIZE)
+            elif char != MAP_EMPTY:
+                raise ValueError(f'Неизвестная клетка карты: {char!r}')
+    x, y = (columns // 2, height // 2) if spawn is None else (
+        spawn[0] // GRID_SIZE, spawn[1] // GRID_SIZE)
+    if collision_mask[x * height + y]:
+        raise ValueError('Змейка начинает в стене карты')
+    return bytes(collision_mask), bytes(free_mask), spawn
+
+
+def mask_cells(mask, rows, value=1):
+    """Функция возвращает клетки, у которых в маске mask стоит value."""
+    return tuple((number // rows * GRID_SIZE, number % rows * GRID_SIZE)
+                 for number, flag in enumerate(mask) if flag == value)
+
+
+def parse_level(section, board_size):
+    """Функция разбирает секцию уровня в запись таблицы уровней."""
+    level = {
+        'speed': section.getint('speed', SPEED),
+        'figs': section.getint('figs', 0),
+        'walls': section.getint('walls', 0),
+    }
+    if 'map' in section:
+        rows = board_size[1]
+        collision_mask, free_mask, spawn = parse_map(
+            section['map'].split(), board_size)
+        # Клетки без еды, кроме стен: стены отмечаются в индексе сами
+        reserved = bytes(free | wall
+                         for free, wall in zip(free_mask, collision_mask))
+        level.update(
+            free_mask=free_mask, wall_cells=mask_cells(collision_mask, rows),
+            reserved=mask_cells(reserved, rows, 0))
+        if spawn is not None:
+            level['spawn'] = spawn
+    return level
+
+
+def load_levels(path, board_size=(GRID_WIDTH, GRID_HEIGHT)):
+    """
+    Функция загружает пакет уровней для поля board_size (в клетках)
+    и возвращает таблицу уровней для Game. Пакет разбирается один раз,
+    повторная загрузка возвращает ту же таблицу.
+    """
+    key = (os.path.abspath(path), tuple(board_size))
+    levels = level_packs.get(key)
+    if levels is None:
+        # Комментарии только через ;, потому что # - стена на карте
+        parser = configparser.ConfigParser(comment_prefixes=(';',),
+                                           interpolation=None)
+        with open(path, encoding='utf-8') as file:
+            parser.read_file(file)
+        levels = {int(name): parse_level(parser[name], board_size)
+                  for name in parser.sections()}
+        for difficulty in REQUIRED_LEVELS:
+            if difficulty not in levels:
+                raise ValueError(f'В пакете нет уровня {difficulty}')
+        level_packs[key] = levels
+    return levels
+
+
+def pack_digest(path):
+    """
+    Функция возвращает отпечаток пакета уровней из файла path или
+    NO_PACK_DIGEST при path=None. Отпечаток меняется при любой правке файла.
+    """
+    if path is None:
+        return NO_PACK_DIGEST
+    with open(path, 'rb') as file:
+        return hashlib.sha256(file.read()).digest()[:PACK_DIGEST_SIZE]
@@ -0,0 +1,70 @@
+"""
+Наблюдения партии Змейки для агентов в виде массивов NumPy без копирования.
+
+Плоскости клеток (grid_planes) - представление буфера FreeCells.planes,
+который движок и так ведет на каждом ходу: Snake.move отмечает новую голову
+и убранный хвост, а методы размещения еды и стен - свои клетки. Массив
+создается один раз и сам показывает текущее состояние партии, шаг ничего
+не копирует и не пересобирает по спискам positions:
+
+    planes = grid_planes(game)
+    while True:
+        game.step(agent(planes))
+
+Плоскости идут в порядке PLANE_NAMES, номера плоскостей - константы движка
+(SNAKE_LAYER, APPLE_LAYER, FIG_LAYER, WALL_LAYER, HEAD_PLANE). В клетке -
+сколько объектов плоскости ее занимают. Массив имеет форму
+(плоскости, столбцы, строки) и индексируется [плоскость, x, y], как массивы
+pygame.surfarray.
+
+Пиксели экрана (screen_pixels) - представление поверхности pygame через
+pygame.surfarray.pixels3d, тоже без копирования. Пока такое представление
+существует, поверхность заблокирована и рисовать на ней нельзя, поэтому
+оно выдается на время блока with.
+"""
+from contextlib import contextmanager
+
+import numpy as np
+
+from snake_engine import PLANES
+
+# Имена плоскостей клеток по их номерам
+PLANE_NAMES = ('body', 'apple', 'figs', 'walls', 'head')
+
+
+def grid_planes(game):
+    """
+    Функция возвращает плоскости клеток партии game - массив uint8 только
+    для чтения формы (len(PLANES), столбцы, строки), который ссылается
+    на индекс свободных клеток партии и меняется вместе с ним. Поле больше
+    DENSE_CELLS клеток хранит плоскости разреженно, для него ValueError.
+    """
+    free_cells = game.free_cells
+    if not isinstance(free_cells.planes, bytearray):
+        raise ValueError('Плоскости без копирования есть только у поля '
+                         'до DENSE_CELLS клеток')
+    planes = np.frombuffer(free_cells.planes, dtype=np.uint8).reshape(
+        len(PLANES), free_cells.columns, free_cells.rows)
+    # Запись в плоскости сломала бы индекс партии
+    planes.flags.writeable = False
+    return planes
+
+
+@contextmanager
+def screen_pixels(surface=None):
+    """
+    Контекстный менеджер выдает пиксели поверхности (по умолчанию - окна
+    игры) массивом формы (ширина, высота, 3) без копирования. Поверхность
+    заблокирована до выхода из блока, массив после выхода использовать
+    нельзя.
+    """
+    # pygame нужен только для пикселей, плоскости клеток обходятся без него
+    import pygame as pg
+
+    if surface is None:
+        surface = pg.display.get_surface()
+    pixels = pg.surfarray.pixels3d(surface)
+    try:
+        yield pixels
+    finally:
+        del pixels
@@ -0,0 +1,149 @@
+"""
+Конвейер симуляции и отрисовки Змейки.
+
+В обычном режиме тик игры и отрисовка идут по очереди в одном цикле,
+поэтому медленная отрисовка (запись кадров, оверлей замеров) задерживает
+следующий тик. В конвейерном режиме тики исполняет отдельный поток
+Simulation: после каждого тика он публикует неизменяемый снимок TickSnapshot
+в двойной буфер SnapshotBuffer. Цикл отрисовки в главном потоке берет
+последний опубликованный снимок и рисует его, пропуская снимки, которые
+не успел нарисовать. Время тика от отрисовки больше не зависит.
+
+Партию меняет только поток симуляции: ввод игрока передается ему командами
+(submit) и применяется перед следующим тиком.
+
+    python the_snake.py --pipelined
+"""
+import queue
+import threading
+from collections import namedtuple
+from time import perf_counter
+
+# Максимальное отставание симуляции в мс, которое догоняется после
+# долгого кадра - при большем отставании лишние тики пропускаются.
+# Предел общий для потока симуляции и обычного цикла игры (the_snake)
+MAX_SIMULATION_LAG = 1000
+
+# Снимок партии после тика: номер тика, клетки змейки от головы к хвосту,
+# яблоко, инжиры, клетки всех стен и карты уровня, счет и уровень сложности
+TickSnapshot = namedtuple(
+    'TickSnapshot', 'tick snake apple figs walls score difficulty')
+
+
+class SnapshotBuffer:
+    """
+    Двойной буфер снимков: симуляция пишет снимок в задний слот и меняет
+    слоты местами, отрисовка читает передний. Снимки неизменяемы, поэтому
+    читатель может рисовать полученный снимок сколько угодно долго.
+    """
+
+    def __init__(self):
+        """Метод инициализации пустого буфера."""
+        self.slots = [None, None]
+        self.front = 0
+        self.lock = threading.Lock()
+
+    def publish(self, snapshot):
+        """Метод публикует снимок - он становится последним."""
+        back = 1 - self.front
+        self.slots[back] = snapshot
+        with self.lock:
+            self.front = back
+
+    def latest(self):
+        """Метод возвращает последний опубликованный снимок или None."""
+        with self.lock:
+            return self.slots[self.front]
+
+
+class Simulation(threading.Thread):
+    """
+    Поток симуляции: исполняет тики партии game функцией tick с шагом
+    по скорости партии (без ограничения, если у партии включен turbo)
+    и публикует снимок каждого тика в буфер buffer.
+    Атрибут commands - очередь команд ввода, error - ошибка, остановившая
+    симуляцию, или None, dropped_ticks - тики, пропущенные из-за отставания.
+    """
+
+    def __init__(self, game, tick):
+        """Метод инициализации потока, первый снимок публикуется сразу."""
+        super().__init__(name='simulation', daemon=True)
+        self.game = game
+        self.tick = tick
+        self.buffer = SnapshotBuffer()
+        self.commands = queue.SimpleQueue()
+        self.stopped = threading.Event()
+        self.error = None
+        self.dropped_ticks = 0
+        self.obstacles = None
+        self.walls = ()
+        self.buffer.publish(self.snapshot())
+
+    def submit(self, function, *args):
+        """Метод ставит в очередь команду function(game, *args)."""
+        self.commands.put((function, args))
+
+    def snapshot(self):
+        """
+        Метод возвращает снимок партии. Клетки стен собираются заново
+        только при смене списка стен, то есть при смене уровня.
+        """
+        game = self.game
+        if game.obstacles is not self.obstacles:
+            self.obstacles = game.obstacles
+            self.walls = tuple(cell for wall in game.obstacles
+                               for cell in wall.get_cells())
+        return TickSnapshot(
+            game.ticks, tuple(game.snake.positions), game.apple.position,
+            tuple(fig.position for fig in game.figs), self.walls,
+            game.score, game.difficulty)
+
+    def apply_commands(self):
+        """Метод применяет к партии команды ввода, пришедшие после тика."""
+        while True:
+            try:
+                function, args = self.commands.get_nowait()
+            except queue.Empty:
+                return
+            function(self.game, *args)
+
+    def run(self):
+        """Метод потока: тики с фиксированным шагом до остановки."""
+        next_tick = perf_counter()
+        try:
+            while True:
+                next_tick = self.wait_next_tick(next_tick)
+                if self.stopped.is_set():
+                    return
+                self.apply_commands()
+                self.tick(self.game)
+                self.buffer.publish(self.snapshot())
+        except Exception as error:
+            self.error = error
+
+    def wait_next_tick(self, next_tick):
+        """
+        Метод ждет начала следующего тика и возвращает его время.
+        При слишком большом отставании лишние тики пропускаются.
+        """
+        now = perf_counter()
+        if getattr(self.game, 'turbo', False):
+            return now
+        tick_time = 1 / self.game.speed
+        next_tick += tick_time
+        if (now - next_tick) * 1000 > MAX_SIMULATION_LAG:
+            self.dropped_ticks += int((now - next_tick) / tick_time)
+            next_tick = now
+        self.stopped.wait(max(next_tick - now, 0))
+        return next_tick
+
+    def check(self):
+        """Метод выбрасывает ошибку, остановившую симуляцию, если она была."""
+        if self.error is not None:
+            raise self.error
+
+    def stop(self):
+        """Метод останавливает поток и дожидается его завершения."""
+        self.stopped.set()
+        if self.is_alive():
+            self.join()
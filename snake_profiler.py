@@ -0,0 +1,108 @@
+"""
+Замеры времени фаз игрового цикла.
+
+Каждая фаза кадра (ввод, движение, проверка столкновений, отрисовка, вывод
+на дисплей и кадр целиком) пишет длительность в свой кольцевой буфер
+последних замеров. Буферы выделяются один раз, поэтому замер стоит одного
+вызова perf_counter и записи в массив. Перцентили считаются только при
+запросе сводки - для оверлея или выгрузки в CSV/JSON.
+"""
+import csv
+import json
+from array import array
+from time import perf_counter
+
+# Фазы кадра в порядке исполнения
+PHASES = ('input', 'move', 'collisions', 'draw', 'present', 'frame')
+
+# Сколько последних замеров хранится для каждой фазы
+HISTORY_SIZE = 1024
+
+
+class SampleRing:
+    """
+    Кольцевой буфер последних замеров в мс. Замеры хранятся как есть,
+    без разбиения на интервалы, перцентили считаются по ним при запросе.
+    """
+
+    def __init__(self, size=HISTORY_SIZE):
+        """Метод инициализации: буфер на size замеров."""
+        self.samples = array('d', bytes(8 * size))
+        self.index = 0
+        self.count = 0
+
+    def add(self, value):
+        """Метод добавляет замер, вытесняя самый старый."""
+        self.samples[self.index] = value
+        self.index = (self.index + 1) % len(self.samples)
+        if self.count < len(self.samples):
+            self.count += 1
+
+    def percentile(self, percent):
+        """Метод возвращает перцентиль замеров или 0, если их нет."""
+        if not self.count:
+            return 0.0
+        values = sorted(self.samples[:self.count])
+        return values[min(self.count - 1, self.count * percent // 100)]
+
+    def summary(self):
+        """Метод возвращает сводку: число замеров, p50, p99 и максимум."""
+        values = self.samples[:self.count]
+        return {
+            'count': self.count,
+            'p50': self.percentile(50),
+            'p99': self.percentile(99),
+            'max': max(values, default=0.0),
+        }
+
+
+class FrameProfiler:
+    """
+    Класс замеров фаз кадра.
+    Атрибут rings - буферы замеров по фазам, dropped_ticks - тики,
+    пропущенные из-за слишком большого отставания симуляции.
+    """
+
+    def __init__(self, size=HISTORY_SIZE):
+        """Метод инициализации замеров."""
+        self.rings = {phase: SampleRing(size) for phase in PHASES}
+        self.dropped_ticks = 0
+
+    def measure(self, phase, start):
+        """
+        Метод записывает время фазы от start до текущего момента
+        и возвращает текущий момент - начало следующей фазы.
+        """
+        now = perf_counter()
+        self.rings[phase].add((now - start) * 1000)
+        return now
+
+    def add(self, phase, milliseconds):
+        """Метод записывает готовый замер фазы в мс."""
+        self.rings[phase].add(milliseconds)
+
+    def summary(self):
+        """Метод возвращает сводку по всем фазам."""
+        return {
+            'phases': {phase: ring.summary()
+                       for phase, ring in self.rings.items()},
+            'dropped_ticks': self.dropped_ticks,
+        }
+
+    def export(self, path):
+        """
+        Метод выгружает сводку в файл: в CSV, если у файла расширение .csv,
+        иначе в JSON.
+        """
+        summary = self.summary()
+        if str(path).endswith('.csv'):
+            with open(path, 'w', newline='') as file:
+                writer = csv.writer(file)
+                writer.writerow(('phase', 'count', 'p50', 'p99', 'max'))
+                for phase, stats in summary['phases'].items():
+                    writer.writerow((phase, stats['count'], stats['p50'],
+                                     stats['p99'], stats['max']))
+                writer.writerow(('dropped_ticks', summary['dropped_ticks']))
+        else:
+            with open(path, 'w') as file:
+                json.dump(summary, file, indent=2)
@@ -0,0 +1,187 @@
+"""
+Запись и повтор партий Змейки.
+
+Партия полностью определяется своим seed, начальным уровнем сложности,
+размером поля, пакетом уровней и действиями игрока, поэтому запись хранит
+только их: заголовок и по одному байту на тик. В младших трех битах байта -
+направление змейки в этом тике (номер в DIRECTIONS + 1), в старших пяти -
+уровень сложности, выбранный в этом тике (0 - не выбран). Направление
+пишется в каждом тике: после сброса змейки оно меняется и без участия
+игрока.
+
+Сам пакет уровней в запись не входит, только его отпечаток
+(snake_levels.pack_digest): повтор требует тот же файл пакета и отказывается
+играть с другим.
+
+Повтор без окна пересчитывает партию движком snake_engine, повтор на экране
+рисует ее через the_snake с заданной скоростью:
+    python snake_replay.py game.snkr
+    python snake_replay.py game.snkr --render --speed 60
+    python snake_replay.py game.snkr --levels levels/maze.ini
+"""
+import argparse
+import struct
+import time
+
+from snake_engine import DIRECTIONS, GRID_HEIGHT, GRID_WIDTH, Game
+from snake_levels import NO_PACK_DIGEST, load_levels, pack_digest
+
+# Заголовок записи: сигнатура, версия формата, seed, начальная сложность,
+# размер поля в клетках, отпечаток пакета уровней
+REPLAY_MAGIC = b'SNKR'
+REPLAY_VERSION = 1
+REPLAY_HEADER = struct.Struct(f'<4sBQBHH{len(NO_PACK_DIGEST)}s')
+
+# Разбиение байта тика на направление и уровень сложности
+DIRECTION_BITS = 3
+DIRECTION_MASK = (1 << DIRECTION_BITS) - 1
+
+
+class Replay:
+    """
+    Класс записи партии.
+    Атрибуты seed, difficulty и board_size - параметры создания партии,
+    levels_digest - отпечаток пакета уровней партии, ticks - байты тиков.
+    """
+
+    def __init__(self, seed, difficulty=1, ticks=b'',
+                 board_size=(GRID_WIDTH, GRID_HEIGHT),
+                 levels_digest=NO_PACK_DIGEST):
+        """Метод инициализации записи."""
+        self.seed = seed
+        self.difficulty = difficulty
+        self.ticks = bytearray(ticks)
+        self.board_size = tuple(board_size)
+        self.levels_digest = levels_digest
+
+    def record(self, game):
+        """
+        Метод записывает тик партии. Вызывается перед game.step: запоминает
+        направление змейки в этом тике (с поворотом из очереди ввода)
+        и уровень сложности, выбранный игроком.
+        """
+        code = DIRECTIONS.index(game.snake.next_turn()) + 1
+        if game.next_difficulty is not None:
+            code |= game.next_difficulty << DIRECTION_BITS
+        self.ticks.append(code)
+
+    def to_bytes(self):
+        """Метод возвращает запись в двоичном формате."""
+        return REPLAY_HEADER.pack(REPLAY_MAGIC, REPLAY_VERSION, self.seed,
+                                  self.difficulty, *self.board_size,
+                                  self.levels_digest) + self.ticks
+
+    @classmethod
+    def from_bytes(cls, data):
+        """
+        Метод читает запись из двоичного формата. Чужие и обрезанные
+        данные вызывают ValueError.
+        """
+        try:
+            (magic, version, seed, difficulty, columns, rows,
+             digest) = REPLAY_HEADER.unpack_from(data)
+        except struct.error as error:
+            raise ValueError('Запись партии обрезана') from error
+        if magic != REPLAY_MAGIC or version != REPLAY_VERSION:
+            raise ValueError('Неизвестный формат записи партии')
+        return cls(seed, difficulty, data[REPLAY_HEADER.size:],
+                   (columns, rows), digest)
+
+    def save(self, path):
+        """Метод сохраняет запись в файл."""
+        with open(path, 'wb') as file:
+            file.write(self.to_bytes())
+
+    @classmethod
+    def load(cls, path):
+        """Метод читает запись из файла."""
+        with open(path, 'rb') as file:
+            return cls.from_bytes(file.read())
+
+    def new_game(self, levels_path=None, game_class=Game):
+        """
+        Метод создает партию класса game_class для повтора записи: с теми же
+        seed, сложностью, полем и пакетом уровней из файла levels_path.
+        Если пакет не тот, с которым партия записана, повтор разошелся бы
+        с записью, поэтому выбрасывается ValueError.
+        """
+        if pack_digest(levels_path) != self.levels_digest:
+            raise ValueError('Партия записана с другим пакетом уровней')
+        levels = None
+        if levels_path is not None:
+            levels = load_levels(levels_path, self.board_size)
+        return game_class(self.difficulty, seed=self.seed,
+                          board_size=self.board_size, levels=levels)
+
+    def play(self, game=None):
+        """
+        Генератор повторяет партию тик за тиком и после каждого тика отдает
+        партию. По умолчанию партия создается движком без окна по встроенным
+        уровням, но можно передать свою, созданную методом new_game.
+        """
+        if game is None:
+            game = self.new_game()
+        for code in self.ticks:
+            # Направление в записи уже проверено при игре, поэтому
+            # ставится напрямую, мимо очереди ввода
+            game.snake.direction = DIRECTIONS[(code & DIRECTION_MASK) - 1]
+            game.step(difficulty=(code >> DIRECTION_BITS) or None)
+            yield game
+
+
+def replay_headless(replay, levels_path=None):
+    """
+    Функция пересчитывает партию без окна и возвращает ее в конце.
+    levels_path - файл пакета уровней, с которым партия записана.
+    """
+    game = replay.new_game(levels_path)
+    for game in replay.play(game):
+        pass
+    return game
+
+
+def replay_on_screen(replay, speed, levels_path=None):
+    """Функция показывает партию на экране со скоростью speed тиков в с."""
+    import pygame as pg
+
+    import the_snake
+
+    pg.init()
+    the_snake.init_display()
+    game = replay.new_game(levels_path, the_snake.SnakeGame)
+    the_snake.setup_board(game)
+    the_snake.render_frame(game)
+    for game in replay.play(game):
+        the_snake.clock.tick(speed)
+        for event in pg.event.get():
+            if event.type == pg.QUIT:
+                return game
+        the_snake.render_frame(game)
+    return game
+
+
+def main(args=None):
+    """Функция повторяет запись партии и выводит итог."""
+    parser = argparse.ArgumentParser(description='Повтор партии Змейки')
+    parser.add_argument('path', help='файл записи партии')
+    parser.add_argument('--render', action='store_true',
+                        help='показать партию на экране')
+    parser.add_argument('--speed', type=int, default=20,
+                        help='скорость показа, тиков в секунду')
+    parser.add_argument('--levels', metavar='PATH',
+                        help='пакет уровней, с которым партия записана')
+    args = parser.parse_args(args)
+    replay = Replay.load(args.path)
+    start = time.perf_counter()
+    if args.render:
+        game = replay_on_screen(replay, args.speed, args.levels)
+    else:
+        game = replay_headless(replay, args.levels)
+    elapsed = time.perf_counter() - start
+    print(f'seed={replay.seed} ticks={game.ticks} score={game.score} '
+          f'length={game.snake.length} '
+          f'({game.ticks / max(elapsed, 1e-9):.0f} тиков/с)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,269 @@
+"""
+Сервер арены: одно поле, много змеек, игроки подключаются по сети.
+
+Сервер ведет единственную авторитетную партию (Arena) на asyncio в одном
+потоке. Игрок подключается по TCP, получает снимок поля и номер своей
+змейки, а затем - по одной строке JSON на тик только с изменениями
+(дельта): новые головы змеек, убранные клетки хвостов, новые места еды,
+появившиеся и ушедшие змейки. Координаты передаются в клетках.
+Игрок управляет змейкой, отправляя строки с направлением: UP, DOWN, LEFT
+или RIGHT. Повороты идут в очередь ввода змейки, как в обычной игре.
+
+Дельта кодируется один раз на тик и дописывается в буфер каждого
+подключения без ожидания отправки, поэтому тик не ждет медленных игроков.
+Игрок, у которого в буфере скопилось больше MAX_CLIENT_BUFFER байт,
+отключается, чтобы не копить для него память.
+
+    python snake_server.py --port 8765 --board 64x48
+    (в другом терминале) nc localhost 8765
+"""
+import argparse
+import asyncio
+import json
+import random
+
+from snake_engine import (DOWN, GRID_SIZE, LEFT, RIGHT, SPEED, UP, Apple,
+                          FreeCells, Snake)
+
+# Размер поля арены в клетках и количество яблок на нем
+ARENA_SIZE = (64, 48)
+ARENA_APPLES = 8
+
+# Сколько байт может ждать отправки одному игроку, прежде чем его отключат
+MAX_CLIENT_BUFFER = 1 << 16
+
+# Сколько подключений может ждать приема одновременно
+ACCEPT_BACKLOG = 1024
+
+# Максимальное отставание тиков в с: при большем отставании пропущенные
+# тики не догоняются
+MAX_TICK_LAG = 1
+
+# Направления по командам игрока
+DIRECTION_NAMES = {'UP': UP, 'DOWN': DOWN, 'LEFT': LEFT, 'RIGHT': RIGHT}
+
+
+def to_cell(position):
+    """Функция переводит позицию в пикселях в координаты клетки."""
+    return position[0] // GRID_SIZE, position[1] // GRID_SIZE
+
+
+def encode(message):
+    """Функция кодирует сообщение в строку JSON для отправки."""
+    return json.dumps(message, separators=(',', ':')).encode() + b'\n'
+
+
+class Arena:
+    """
+    Класс арены без сети: змейки (snakes, по номерам) и яблоки (apples)
+    на одном поле с общим индексом свободных клеток.
+    Атрибут delta - изменения поля с прошлого тика в порядке применения:
+    left - номера ушедших змеек, joined - [номер, x, y] новых змеек,
+    heads - [номер, x, y] новых голов, tails - [номер, x, y] убранных
+    клеток хвоста, food - [номер яблока, x, y] перенесенной еды, spawned -
+    [номер, x, y] разбившихся змеек, начавших заново с одной клетки.
+    """
+
+    def __init__(self, board_size=ARENA_SIZE, apples=ARENA_APPLES,
+                 seed=None):
+        """Метод инициализации арены с заданным полем и числом яблок."""
+        self.board_size = board_size
+        self.rng = random.Random(seed)
+        self.free_cells = FreeCells(rng=self.rng, board_size=board_size)
+        self.snakes = {}
+        self.next_id = 1
+        self.ticks = 0
+        self.apples = [Apple(free_cells=self.free_cells)
+                       for _ in range(apples)]
+        self.delta = self.new_delta()
+
+    def new_delta(self):
+        """Метод возвращает пустую дельту следующего тика."""
+        return {'tick': self.ticks + 1, 'left': [], 'joined': [],
+                'heads': [], 'tails': [], 'food': [], 'spawned': []}
+
+    def snapshot(self):
+        """Метод возвращает поле целиком - для только что подключившихся."""
+        return {
+            'tick': self.ticks,
+            'board': self.board_size,
+            'snakes': [[snake_id, [to_cell(cell) for cell in snake.positions]]
+                       for snake_id, snake in self.snakes.items()],
+            'food': [to_cell(apple.position) for apple in self.apples],
+        }
+
+    def add_snake(self):
+        """Метод добавляет змейку на свободную клетку и возвращает ее номер."""
+        snake_id = self.next_id
+        self.next_id += 1
+        snake = Snake(object_position=self.free_cells.sample(),
+                      free_cells=self.free_cells,
+                      board_size=self.board_size)
+        self.snakes[snake_id] = snake
+        self.delta['joined'].append(
+            [snake_id, *to_cell(snake.get_head_position())])
+        return snake_id
+
+    def remove_snake(self, snake_id):
+        """
+        Метод убирает змейку с поля. Змейка, пришедшая в этом же тике,
+        просто исчезает из joined: клиенты ее еще не видели.
+        """
+        self.snakes.pop(snake_id).positions.clear()
+        joined = self.delta['joined']
+        for i, (joined_id, *_) in enumerate(joined):
+            if joined_id == snake_id:
+                del joined[i]
+                return
+        self.delta['left'].append(snake_id)
+
+    def turn(self, snake_id, direction):
+        """Метод ставит поворот в очередь ввода змейки."""
+        self.snakes[snake_id].turn(direction)
+
+    def respawn(self, snake_id, snake):
+        """Метод начинает змейку заново с одной свободной клетки."""
+        snake.positions.clear()
+        cell = self.free_cells.sample()
+        if cell is not None:
+            snake.position = cell
+        snake.reset()
+        self.delta['spawned'].append([snake_id, *to_cell(snake.position)])
+
+    def move_snakes(self):
+        """Метод двигает все змейки и записывает их головы и хвосты."""
+        heads, tails = self.delta['heads'], self.delta['tails']
+        for snake_id, snake in self.snakes.items():
+            snake.update_direction()
+            snake.move()
+            heads.append([snake_id, *to_cell(snake.get_head_position())])
+            for cell in snake.dropped_tail:
+                tails.append([snake_id, *to_cell(cell)])
+
+    def feed_snakes(self):
+        """Метод проверяет поедание яблок и переносит съеденные яблоки."""
+        apples = {apple.position: i for i, apple in enumerate(self.apples)}
+        for snake in self.snakes.values():
+            i = apples.pop(snake.get_head_position(), None)
+            if i is not None:
+                snake.length += 1
+                apple = self.apples[i]
+                apple.randomize_position()
+                self.delta['food'].append([i, *to_cell(apple.position)])
+
+    def crashed(self, snake):
+        """
+        Проверка, что голова змейки попала на занятую клетку: на свое тело,
+        на другую змейку или в лобовое столкновение.
+        """
+        head = snake.get_head_position()
+        own = snake.positions.count(head)
+        return own > 1 or self.free_cells.counts[head] > own
+
+    def step(self):
+        """
+        Метод выполняет один тик арены и возвращает его дельту.
+        Разбившиеся змейки начинают заново.
+        """
+        self.ticks += 1
+        self.move_snakes()
+        self.feed_snakes()
+        crashed = [(snake_id, snake) for snake_id, snake in self.snakes.items()
+                   if self.crashed(snake)]
+        for snake_id, snake in crashed:
+            self.respawn(snake_id, snake)
+        delta, self.delta = self.delta, self.new_delta()
+        return delta
+
+
+class ArenaServer:
+    """
+    Класс сервера арены.
+    Атрибут clients - подключенные игроки: потоки записи и номера их змеек,
+    speed - тиков в секунду.
+    """
+
+    def __init__(self, arena, speed=SPEED):
+        """Метод инициализации сервера для арены arena."""
+        self.arena = arena
+        self.speed = speed
+        self.clients = {}
+
+    async def handle_client(self, reader, writer):
+        """Корутина обслуживает одного игрока от подключения до выхода."""
+        snake_id = self.arena.add_snake()
+        self.clients[writer] = snake_id
+        writer.write(encode({'you': snake_id,
+                             'snapshot': self.arena.snapshot()}))
+        try:
+            async for line in reader:
+                direction = DIRECTION_NAMES.get(
+                    line.strip().decode(errors='replace').upper())
+                if direction is not None and writer in self.clients:
+                    self.arena.turn(snake_id, direction)
+        except (ConnectionError, ValueError):
+            # Обрыв связи или слишком длинная строка от игрока
+            pass
+        finally:
+            self.disconnect(writer)
+
+    def disconnect(self, writer):
+        """Метод отключает игрока и убирает его змейку с поля."""
+        snake_id = self.clients.pop(writer, None)
+        if snake_id is not None:
+            self.arena.remove_snake(snake_id)
+        writer.close()
+
+    def broadcast(self, data):
+        """
+        Метод дописывает данные в буфер каждого игрока без ожидания
+        отправки. Отстающие игроки отключаются.
+        """
+        for writer in list(self.clients):
+            if writer.transport.get_write_buffer_size() > MAX_CLIENT_BUFFER:
+                self.disconnect(writer)
+            else:
+                writer.write(data)
+
+    async def run_ticks(self):
+        """Корутина исполняет тики арены с фиксированным шагом."""
+        loop = asyncio.get_running_loop()
+        tick_time = 1 / self.speed
+        next_tick = loop.time()
+        while True:
+            self.broadcast(encode(self.arena.step()))
+            next_tick += tick_time
+            delay = next_tick - loop.time()
+            if delay < -MAX_TICK_LAG:
+                next_tick = loop.time()
+            await asyncio.sleep(max(delay, 0))
+
+    async def serve(self, host='localhost', port=8765):
+        """Корутина принимает подключения и исполняет тики арены."""
+        server = await asyncio.start_server(self.handle_client, host, port,
+                                            backlog=ACCEPT_BACKLOG)
+        async with server:
+            await asyncio.gather(server.serve_forever(), self.run_ticks())
+
+
+def main(args=None):
+    """Функция запускает сервер арены."""
+    parser = argparse.ArgumentParser(description='Сервер арены Змейки')
+    parser.add_argument('--host', default='localhost')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--board', metavar='WxH', default=None,
+                        help='размер поля в клетках, например 64x48')
+    parser.add_argument('--apples', type=int, default=ARENA_APPLES,
+                        help='количество яблок на поле')
+    parser.add_argument('--speed', type=int, default=SPEED,
+                        help='тиков в секунду')
+    args = parser.parse_args(args)
+    board_size = ARENA_SIZE
+    if args.board is not None:
+        board_size = tuple(int(size) for size in args.board.split('x'))
+    server = ArenaServer(Arena(board_size, args.apples), args.speed)
+    asyncio.run(server.serve(args.host, args.port))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,258 @@
+"""
+Снимок полного состояния партии Змейки и восстановление из него.
+
+Снимок - компактная двоичная запись всего, от чего зависит дальнейший ход
+партии: тела, направления, очереди поворотов и длины змейки, клеток еды
+и стен, уровня сложности, счетчиков, состояния генератора случайных чисел
+и порядка свободных клеток в индексе (от него зависит, куда попадет еда).
+Клетки записываются номерами x * rows + y: по 2 байта на обычном поле
+и по 4 байта на поле больше 65536 клеток.
+
+Восстановление идет в уже созданную партию с тем же полем и не создает
+объекты заново, поэтому подходит для отката и перебора ходов из одного
+состояния:
+    state = save_state(game)
+    for direction in DIRECTIONS:
+        restore_state(game, state)
+        game.step(direction)
+"""
+import struct
+from collections import namedtuple
+
+from snake_engine import CRASH_SELF, CRASH_WALL, DIRECTIONS, Game, SnakeBody
+
+# Заголовок снимка: сигнатура, версия формата, размер поля в клетках,
+# уровень сложности, выбранный уровень (0 - нет), причина гибели змейки,
+# seed, тики и счет партии
+SNAPSHOT_MAGIC = b'SNKS'
+SNAPSHOT_VERSION = 1
+SNAPSHOT_HEADER = struct.Struct('<4sBHHBBBQQI')
+
+# Состояние генератора random.Random: 625 слов, флаг и значение gauss_next
+RNG_STATE = struct.Struct('<625I?d')
+RNG_VERSION = 3
+
+# Коды причин гибели змейки
+CRASH_CAUSES = (None, CRASH_SELF, CRASH_WALL)
+
+# Поле, до которого номер клетки помещается в 2 байта
+SHORT_CELLS = 1 << 16
+
+
+def cell_format(free_cells):
+    """Функция возвращает формат struct для номера клетки поля."""
+    return 'H' if free_cells.columns * free_cells.rows <= SHORT_CELLS else 'I'
+
+
+def pack_numbers(number_format, numbers):
+    """Функция упаковывает количество чисел и сами числа."""
+    return struct.pack(f'<I{len(numbers)}{number_format}', len(numbers),
+                       *numbers)
+
+
+class SnapshotReader:
+    """Класс чтения снимка по порядку: data - байты, offset - позиция."""
+
+    def __init__(self, data):
+        """Метод инициализации чтения с начала снимка."""
+        self.data = data
+        self.offset = 0
+
+    def unpack(self, layout):
+        """Метод читает значения по формату struct.Struct."""
+        values = layout.unpack_from(self.data, self.offset)
+        self.offset += layout.size
+        return values
+
+    def numbers(self, number_format):
+        """Метод читает числа, записанные pack_numbers."""
+        count, = struct.unpack_from('<I', self.data, self.offset)
+        layout = struct.Struct(f'<{count}{number_format}')
+        self.offset += 4
+        return self.unpack(layout)
+
+
+def save_state(game):
+    """Функция возвращает снимок состояния партии в двоичном формате."""
+    free_cells = game.free_cells
+    number = free_cells.cell_number
+    cells = cell_format(free_cells)
+    snake = game.snake
+    _, words, gauss = game.rng.getstate()
+    order = [value for item in free_cells.moved() for value in item]
+    return b''.join((
+        SNAPSHOT_HEADER.pack(
+            SNAPSHOT_MAGIC, SNAPSHOT_VERSION, free_cells.columns,
+            free_cells.rows, game.difficulty, game.next_difficulty or 0,
+            CRASH_CAUSES.index(game.crash_cause), game.seed, game.ticks,
+            game.score),
+        RNG_STATE.pack(*words, gauss is not None, gauss or 0.0),
+        struct.pack('<BI', DIRECTIONS.index(snake.direction), snake.length),
+        pack_numbers('B', [DIRECTIONS.index(turn) for turn in snake.turns]),
+        pack_numbers(cells, [number(cell) for cell in snake.positions]),
+        pack_numbers(cells, [number(game.apple.position)]
+                     + [number(fig.position) for fig in game.figs]),
+        pack_numbers('B', [DIRECTIONS.index(wall.direction)
+                           for wall in game.walls]),
+        pack_numbers(cells, [number(wall.position) for wall in game.walls]),
+        struct.pack('<I', free_cells.size),
+        pack_numbers(cells, order),
+    ))
+
+
+# Змейка, еда и стены из снимка: код направления, длина, коды очереди
+# поворотов, номера клеток тела, еды (яблоко, затем инжиры) и начал стен,
+# коды направлений стен
+SnapshotObjects = namedtuple(
+    'SnapshotObjects', 'direction length turns body food starts walls')
+
+
+def read_objects(reader, cells):
+    """Функция читает змейку, еду и стены из снимка."""
+    direction, length = reader.unpack(struct.Struct('<BI'))
+    turns = reader.numbers('B')
+    body = reader.numbers(cells)
+    food = reader.numbers(cells)
+    walls = reader.numbers('B')
+    starts = reader.numbers(cells)
+    return SnapshotObjects(direction, length, turns, body, food, starts,
+                           walls)
+
+
+def check_objects(game, difficulty, objects):
+    """
+    Функция проверяет, что объекты снимка подходят уровню difficulty
+    партии game, иначе - ValueError.
+    """
+    level = game.levels[difficulty]
+    if (len(objects.food) != level['figs'] + 1
+            or len(objects.starts) != level['walls']
+            or len(objects.walls) != level['walls']):
+        raise ValueError('Снимок не совпадает с уровнем сложности партии')
+    codes = (objects.direction, *objects.turns, *objects.walls)
+    numbers = (*objects.body, *objects.food, *objects.starts)
+    if (not objects.body or max(codes) >= len(DIRECTIONS)
+            or max(numbers) >= game.free_cells.area):
+        raise ValueError('Снимок партии поврежден')
+
+
+def read_free_cells(game, reader, cells):
+    """
+    Функция читает размер и порядок свободных клеток индекса из снимка
+    и возвращает размер и пары (позиция, клетка) перестановки.
+    """
+    size, = reader.unpack(struct.Struct('<I'))
+    order = reader.numbers(cells)
+    area = game.free_cells.area
+    if (size > area or len(order) % 2
+            or any(number >= area for number in order)):
+        raise ValueError('Снимок партии поврежден')
+    return size, list(zip(order[::2], order[1::2]))
+
+
+def restore_objects(game, objects):
+    """Функция восстанавливает змейку, еду и стены партии из снимка."""
+    free_cells = game.free_cells
+    snake = game.snake
+    snake.direction = DIRECTIONS[objects.direction]
+    snake.length = objects.length
+    snake.turns.clear()
+    snake.turns.extend(DIRECTIONS[turn] for turn in objects.turns)
+    # Тело собирается без индекса, чтобы не менять порядок свободных клеток
+    snake.positions = SnakeBody(map(free_cells.number_cell, objects.body))
+    snake.positions.free_cells = free_cells
+    snake.dropped_tail.clear()
+    snake.last = None
+    for food_object, cell in zip((game.apple, *game.figs), objects.food):
+        food_object.set_position(free_cells.number_cell(cell))
+    for wall, direction, cell in zip(game.walls, objects.walls,
+                                     objects.starts):
+        wall.direction = DIRECTIONS[direction]
+        wall.set_position(free_cells.number_cell(cell))
+
+
+def restore_free_cells(game, size, moved):
+    """
+    Функция восстанавливает индекс свободных клеток: порядок клеток
+    из снимка, счетчики и слои занятости - по восстановленным объектам.
+    """
+    free_cells = game.free_cells
+    free_cells.size = size
+    free_cells.restore_order(moved)
+    free_cells.clear_layers()
+    counts = {}
+    for game_object in game.get_objects():
+        for cell in game_object.get_cells():
+            counts[cell] = counts.get(cell, 0) + 1
+            free_cells.mark(game_object.layer, cell)
+    free_cells.move_head(None, game.snake.get_head_position())
+    if game.level_map is not None:
+        # Клетки карты без еды заняты в индексе, но ни в одном слое
+        for cell in game.level_map.reserved:
+            counts[cell] = counts.get(cell, 0) + 1
+    for game_object in (game.apple, *game.figs, *game.walls):
+        owners = free_cells.owners[game_object.layer]
+        for cell in game_object.get_cells():
+            owners[cell] = game_object
+    free_cells.counts = counts
+
+
+def read_header(game, reader):
+    """
+    Функция читает заголовок снимка и проверяет, что снимок сделан для
+    поля и набора уровней партии game, иначе - ValueError.
+    """
+    header = reader.unpack(SNAPSHOT_HEADER)
+    (magic, version, columns, rows, difficulty, next_difficulty,
+     crash) = header[:7]
+    if magic != SNAPSHOT_MAGIC or version != SNAPSHOT_VERSION:
+        raise ValueError('Неизвестный формат снимка партии')
+    if (columns, rows) != tuple(game.board_size):
+        raise ValueError('Снимок сделан для поля другого размера')
+    if (difficulty not in game.levels or crash >= len(CRASH_CAUSES)
+            or next_difficulty and next_difficulty not in game.levels):
+        raise ValueError('Снимок сделан для другого набора уровней')
+    return header
+
+
+def restore_state(game, data):
+    """
+    Функция восстанавливает партию game из снимка data и возвращает ее.
+    Партия должна быть создана с тем же размером поля. Снимок читается
+    и проверяется целиком до изменения партии: чужой или поврежденный
+    снимок вызывает ValueError и оставляет партию как была.
+    """
+    reader = SnapshotReader(data)
+    try:
+        (_, _, _, _, difficulty, next_difficulty, crash, seed, ticks,
+         score) = read_header(game, reader)
+        *words, has_gauss, gauss = reader.unpack(RNG_STATE)
+        cells = cell_format(game.free_cells)
+        objects = read_objects(reader, cells)
+        check_objects(game, difficulty, objects)
+        size, moved = read_free_cells(game, reader, cells)
+    except struct.error as error:
+        raise ValueError('Снимок партии обрезан') from error
+    # Смена уровня создает объекты уровня, их состояние затем
+    # перезаписывается из снимка
+    if difficulty != game.difficulty:
+        game.set_difficulty(difficulty)
+    game.seed, game.ticks, game.score = seed, ticks, score
+    game.next_difficulty = next_difficulty or None
+    game.crash_cause = CRASH_CAUSES[crash]
+    game.rng.setstate((RNG_VERSION, tuple(words),
+                       gauss if has_gauss else None))
+    restore_objects(game, objects)
+    restore_free_cells(game, size, moved)
+    # Еда и стены встали на клетки из снимка
+    game.free_cells.version += 1
+    return game
+
+
+def load_state(data, game_class=Game):
+    """Функция создает новую партию класса game_class из снимка."""
+    try:
+        columns, rows = SNAPSHOT_HEADER.unpack_from(data)[2:4]
+    except struct.error as error:
+        raise ValueError('Снимок партии обрезан') from error
+    return restore_state(game_class(board_size=(columns, rows)), data)
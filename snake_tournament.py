@@ -0,0 +1,125 @@
+"""
+Турнир ботов: много партий без окна на всех ядрах процессора.
+
+Бот (контроллер) - функция, которая вместо handle_keys получает партию Game
+и возвращает направление из snake_engine или None, чтобы не поворачивать.
+Контроллер задается строкой 'модуль:функция' и загружается в каждом рабочем
+процессе. Партия идет до первой гибели змейки или до лимита тиков, результат
+каждой партии выводится отдельной строкой JSON по мере готовности.
+
+Пример запуска:
+    python snake_tournament.py --controller snake_tournament:random_controller
+        --games 100000 --difficulty 2
+    python snake_tournament.py --controller snake_autopilot:autopilot
+"""
+import argparse
+import json
+import os
+import random
+import sys
+from importlib import import_module
+from multiprocessing import Pool
+
+from snake_engine import DIRECTIONS, Game
+
+# Причина окончания партии, если змейка дожила до лимита тиков
+TIMEOUT = 'timeout'
+
+# Сколько партий отдается рабочему процессу за раз
+CHUNK_SIZE = 64
+
+
+def keep_direction(game):
+    """Контроллер, который никогда не поворачивает."""
+    return None
+
+
+def random_controller(game):
+    """Контроллер, который поворачивает случайно примерно раз в 5 тиков."""
+    if random.randrange(5) == 0:
+        return random.choice(DIRECTIONS)
+    return None
+
+
+def load_controller(spec):
+    """Функция загружает контроллер по строке 'модуль:функция'."""
+    module_name, _, name = spec.partition(':')
+    return getattr(import_module(module_name), name)
+
+
+def play_game(controller, seed, difficulty=1, max_ticks=10000):
+    """
+    Функция играет одну партию до гибели змейки или до лимита тиков
+    и возвращает запись с результатом.
+    """
+    # Случайные контроллеры тоже повторяются при одинаковом seed
+    random.seed(seed)
+    game = Game(difficulty, seed=seed)
+    length = game.snake.length
+    while game.ticks < max_ticks:
+        length = game.snake.length
+        if game.step(controller(game)):
+            break
+    return {
+        'seed': seed,
+        'score': game.score,
+        'length': length if game.crash_cause else game.snake.length,
+        'ticks': game.ticks,
+        'death': game.crash_cause or TIMEOUT,
+    }
+
+
+def _play_task(task):
+    """Функция рабочего процесса: загружает контроллер и играет партию."""
+    controller_spec, seed, difficulty, max_ticks = task
+    return play_game(load_controller(controller_spec), seed, difficulty,
+                     max_ticks)
+
+
+def run_tournament(controller_spec, seeds, difficulty=1, max_ticks=10000,
+                   workers=None):
+    """
+    Функция играет партии с заданными seed в пуле процессов и отдает записи
+    с результатами по мере готовности, в порядке завершения партий.
+    """
+    tasks = ((controller_spec, seed, difficulty, max_ticks)
+             for seed in seeds)
+    with Pool(workers or os.cpu_count()) as pool:
+        yield from pool.imap_unordered(_play_task, tasks, CHUNK_SIZE)
+        # Рабочие процессы завершаются сами, а не по SIGTERM из выхода
+        # из with: процесс, где инициализирован pygame, передает им
+        # обработчик SDL, который SIGTERM перехватывает
+        pool.close()
+        pool.join()
+
+
+def parse_args(args=None):
+    """Функция разбирает аргументы командной строки."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--controller',
+                        default='snake_tournament:random_controller',
+                        help="контроллер в виде 'модуль:функция'")
+    parser.add_argument('--games', type=int, default=1000,
+                        help='количество партий')
+    parser.add_argument('--seed', type=int, default=0,
+                        help='seed первой партии, далее seed + 1 и т.д.')
+    parser.add_argument('--difficulty', type=int, default=1,
+                        help='уровень сложности')
+    parser.add_argument('--max-ticks', type=int, default=10000,
+                        help='лимит тиков на партию')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='число процессов, по умолчанию - по ядрам')
+    return parser.parse_args(args)
+
+
+def main(args=None):
+    """Функция запускает турнир и выводит результаты в stdout."""
+    args = parse_args(args)
+    seeds = range(args.seed, args.seed + args.games)
+    for record in run_tournament(args.controller, seeds, args.difficulty,
+                                 args.max_ticks, args.workers):
+        sys.stdout.write(json.dumps(record, separators=(',', ':')) + '\n')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,55 @@
+import gc
+
+from snake_autopilot import Autopilot, autopilot, pilots, toroidal_distance
+from snake_engine import Game
+from snake_tournament import play_game
+
+
+def test_autopilot_eats_apples_and_avoids_obstacles():
+    record = play_game(autopilot, seed=1, difficulty=2, max_ticks=1000)
+    assert record['score'] >= 20, (
+        'Автопилот должен вести змейку к яблоку.'
+    )
+
+
+def test_autopilot_reuses_distance_field():
+    game = Game(seed=2)
+    pilot = Autopilot()
+    game.step(pilot(game))
+    field = pilot.field
+    apple = game.apple.position
+    while game.apple.position == apple:
+        game.step(pilot(game))
+        if game.apple.position == apple:
+            assert pilot.field is field, (
+                'Поле расстояний должно переиспользоваться между тиками.'
+            )
+    pilot(game)
+    assert pilot.field is not field
+    assert pilot.field.target == game.apple.position
+
+
+def test_autopilot_field_grows_within_budget_on_large_board():
+    game = Game(seed=3, board_size=(2000, 2000))
+    size = (game.free_cells.width, game.free_cells.height)
+    apple = game.apple.position
+    start = toroidal_distance(game.snake.get_head_position(), apple, *size)
+    pilot = Autopilot(field_budget=500)
+    for _ in range(10):
+        game.step(pilot(game))
+    assert len(pilot.field.distances) <= 10 * 500 * 4 + 1, (
+        'За тик поле расстояний должно достраиваться не больше бюджета.'
+    )
+    distance = toroidal_distance(game.snake.get_head_position(), apple, *size)
+    assert distance == start - 10, (
+        'Пока поле не достроено, змейка должна двигаться к яблоку.'
+    )
+
+
+def test_autopilots_of_finished_games_are_freed():
+    for seed in range(5):
+        play_game(autopilot, seed=seed, difficulty=2, max_ticks=100)
+    gc.collect()
+    assert not pilots, (
+        'Автопилоты сыгранных партий не должны оставаться в памяти.'
+    )
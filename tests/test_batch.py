@@ -0,0 +1,34 @@
+import pytest
+
+np = pytest.importorskip('numpy')
+
+
+@pytest.mark.parametrize('difficulty', (1, 2))
+def test_batch_matches_scalar_engine(difficulty):
+    import snake_batch
+    import snake_engine
+
+    seeds = list(range(16))
+    batch = snake_batch.BatchGame(seeds, difficulty)
+    games = [snake_engine.Game(difficulty, seed=seed) for seed in seeds]
+    actions_rng = np.random.default_rng(0)
+    for tick in range(1000):
+        actions = actions_rng.integers(0, 4, len(seeds))
+        actions[actions_rng.random(len(seeds)) < 0.7] = snake_batch.NO_TURN
+        crashed = batch.step(actions)
+        for g, game in enumerate(games):
+            direction = (None if actions[g] == snake_batch.NO_TURN
+                         else snake_engine.DIRECTIONS[actions[g]])
+            assert game.step(direction) == crashed[g]
+            body = [snake_batch.position_to_cell(position)
+                    for position in game.snake.positions]
+            assert body == list(batch.get_body(g)), (
+                f'Тело змейки партии {g} разошлось на тике {tick}.'
+            )
+            assert game.snake.length == batch.lengths[g]
+            assert snake_batch.position_to_cell(
+                game.apple.position) == batch.apples[g], (
+                f'Яблоко партии {g} разошлось на тике {tick}.'
+            )
+            assert [snake_batch.position_to_cell(fig.position)
+                    for fig in game.figs] == list(batch.figs[g])
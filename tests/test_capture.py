@@ -0,0 +1,102 @@
+import io
+import os
+import subprocess
+import sys
+import threading
+
+import pygame
+
+from conftest import BASE_DIR
+
+# Партия в отдельном процессе пишет кадры в стандартный вывод, а те же
+# кадры, снятые с экрана напрямую, - в файл
+STDOUT_SCRIPT = """
+import sys
+import the_snake
+import pygame
+from snake_capture import FrameCapture, open_sink
+the_snake.init_display()
+game = the_snake.SnakeGame(seed=3)
+the_snake.setup_board(game)
+game.capture = FrameCapture(open_sink('-'))
+with open(sys.argv[1], 'wb') as expected:
+    for _ in range(5):
+        the_snake.game_tick(game)
+        the_snake.render_frame(game)
+        expected.write(pygame.image.tobytes(the_snake.screen, 'RGB'))
+game.capture.close()
+"""
+
+
+class ListSink:
+
+    def __init__(self, gate=None):
+        self.frames = []
+        self.gate = gate
+
+    def write(self, surface):
+        if self.gate is not None:
+            self.gate.wait()
+        self.frames.append(pygame.image.tobytes(surface, 'RGB'))
+
+    def close(self):
+        pass
+
+
+def test_capture_rebuilds_frames_from_dirty_regions(_the_snake):
+    import snake_capture
+    _the_snake.init_display()
+    game = _the_snake.SnakeGame(seed=3)
+    _the_snake.setup_board(game)
+    game.capture = snake_capture.FrameCapture(ListSink())
+    expected = []
+    for _ in range(40):
+        _the_snake.game_tick(game)
+        _the_snake.render_frame(game)
+        expected.append(pygame.image.tobytes(_the_snake.screen, 'RGB'))
+    game.capture.close()
+    assert game.capture.dropped == 0
+    assert game.capture.sink.frames == expected, (
+        'Кадры, собранные из изменившихся областей, должны совпадать '
+        'с экраном.'
+    )
+
+
+def test_capture_drops_frames_instead_of_blocking():
+    import snake_capture
+    gate = threading.Event()
+    capture = snake_capture.FrameCapture(ListSink(gate), queue_size=2)
+    surface = pygame.Surface((40, 30))
+    for color in range(10):
+        surface.fill((color, 0, 0))
+        capture.capture(surface, [pygame.Rect(0, 0, 20, 20)])
+    assert capture.dropped >= 7, (
+        'При заполненной очереди кадры должны пропускаться без ожидания.'
+    )
+    gate.set()
+    capture.close()
+    capture = snake_capture.FrameCapture(snake_capture.RawFrameSink(
+        io.BytesIO()))
+    capture.capture(surface)
+    capture.close()
+    assert capture.sink.file.getvalue() == pygame.image.tobytes(
+        surface, 'RGB'
+    )
+
+
+def test_capture_to_stdout_has_only_frames(tmp_path):
+    expected = tmp_path / 'expected.rgb'
+    env = dict(os.environ, SDL_VIDEODRIVER='dummy')
+    env.pop('PYGAME_HIDE_SUPPORT_PROMPT', None)
+    output = subprocess.run(
+        [sys.executable, '-c', STDOUT_SCRIPT, str(expected)],
+        cwd=BASE_DIR, env=env, capture_output=True, check=True,
+    ).stdout
+    frames = expected.read_bytes()
+    assert len(frames) == 5 * 640 * 480 * 3
+    # Начало потока сравнивается отдельно, чтобы лишний вывод перед
+    # кадрами был виден в сообщении, а не тонул в мегабайтах
+    assert output[:100] == frames[:100], (
+        'В стандартный вывод должны попадать только байты кадров.'
+    )
+    assert output == frames
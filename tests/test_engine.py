@@ -0,0 +1,337 @@
+import copy
+import pickle
+import subprocess
+import sys
+import tracemalloc
+
+import pytest
+
+from conftest import BASE_DIR
+
+
+@pytest.fixture
+def engine():
+    import snake_engine
+    return snake_engine
+
+
+def test_engine_import_does_not_need_pygame():
+    code = (
+        'import sys, snake_engine; '
+        'assert "pygame" not in sys.modules, "pygame imported"'
+    )
+    result = subprocess.run(
+        [sys.executable, '-c', code], cwd=BASE_DIR, capture_output=True
+    )
+    assert result.returncode == 0, (
+        'Модуль `snake_engine` не должен импортировать pygame:\n'
+        f'{result.stderr.decode()}'
+    )
+
+
+def test_game_steps_without_display(engine):
+    game = engine.Game()
+    for _ in range(1000):
+        game.step()
+    assert game.snake.length >= 1, (
+        'Убедитесь, что `Game.step` выполняет тик игры без окна.'
+    )
+
+
+def test_snake_cannot_reverse(engine):
+    snake = engine.Snake()
+    snake.turn(engine.LEFT)
+    snake.update_direction()
+    assert snake.direction == engine.RIGHT, (
+        'Змейка не должна разворачиваться на месте.'
+    )
+    snake.turn(engine.UP)
+    snake.update_direction()
+    assert snake.direction == engine.UP
+
+
+def test_turns_apply_one_per_tick(engine):
+    game = engine.Game()
+    game.snake.length = 5
+    for _ in range(5):
+        game.step()
+    game.snake.turn(engine.UP)
+    game.snake.turn(engine.LEFT)
+    assert game.snake.next_turn() == engine.UP
+    assert game.step() is False
+    assert game.snake.direction == engine.UP, (
+        'За тик применяется только первый поворот из очереди.'
+    )
+    assert game.step() is False, (
+        'Второй поворот не должен приводить к столкновению с собой.'
+    )
+    assert game.snake.direction == engine.LEFT
+    for direction in engine.DIRECTIONS * 2:
+        game.snake.turn(direction)
+    assert len(game.snake.turns) == engine.TURN_QUEUE_SIZE
+
+
+def test_snake_crash_is_reported(engine):
+    game = engine.Game(difficulty=2)
+    wall_cell = game.stone_wall.positions[0]
+    game.snake.positions = engine.SnakeBody([wall_cell])
+    game.snake.direction = engine.RIGHT
+    game.stone_wall.place(
+        ((wall_cell[0] + engine.GRID_SIZE) % engine.SCREEN_WIDTH,
+         wall_cell[1])
+    )
+    assert game.step() is True, (
+        'Убедитесь, что `Game.step` сообщает о столкновении со стеной.'
+    )
+    assert game.snake.positions == [game.snake.position]
+
+
+def test_snake_body_tracks_occupied_cells(engine):
+    body = engine.SnakeBody([(0, 0), (20, 0)])
+    body.appendleft((40, 0))
+    assert (40, 0) in body and len(body) == 3
+    assert body.pop() == (20, 0)
+    assert (20, 0) not in body, (
+        'Убедитесь, что клетка хвоста освобождается после удаления.'
+    )
+    assert body[1:] == [(0, 0)]
+    assert copy.deepcopy(body).cells == body.cells
+
+
+def test_snake_bites_itself(engine):
+    snake = engine.Snake()
+    snake.positions = engine.SnakeBody(
+        [(100, 100), (100, 120), (120, 120), (120, 100), (120, 80)]
+    )
+    snake.length = 5
+    snake.direction = engine.RIGHT
+    apple = engine.Apple(occupied_cells=[])
+    apple.position = (0, 0)
+    snake.move()
+    assert engine.check_snake_events(snake, apple) is True, (
+        'Убедитесь, что столкновение змейки с собой обнаруживается.'
+    )
+
+
+def test_free_cells_sampling_skips_occupied(engine):
+    free_cells = engine.FreeCells()
+    total = len(free_cells)
+    occupied = list(free_cells.cells)[:-1]
+    for cell in occupied:
+        free_cells.occupy(cell)
+    assert len(free_cells) == 1
+    apple = engine.Apple(free_cells=free_cells)
+    assert apple.position not in occupied, (
+        'Убедитесь, что яблоко появляется только на свободной клетке.'
+    )
+    assert len(free_cells) == 0
+    apple.randomize_position()
+    assert len(free_cells) == 0, (
+        'Убедитесь, что на заполненном поле объект остается на месте.'
+    )
+    apple.remove_from_board()
+    for cell in occupied:
+        free_cells.release(cell)
+    assert len(free_cells) == total
+
+
+def test_game_keeps_free_cells_in_sync(engine):
+    game = engine.Game(difficulty=2)
+    for tick in range(2000):
+        game.step()
+        if tick % 500 == 0:
+            game.set_difficulty(1 + tick // 500 % 2)
+    occupied = set(game.snake.positions) | {game.apple.position}
+    occupied |= {fig.position for fig in game.figs}
+    if game.stone_wall is not None:
+        occupied |= set(game.stone_wall.positions)
+    assert set(game.free_cells.counts) == occupied, (
+        'Индекс свободных клеток должен совпадать с клетками объектов.'
+    )
+    assert len(game.free_cells) + len(occupied) == (
+        engine.GRID_WIDTH * engine.GRID_HEIGHT
+    )
+    for game_object in game.get_objects():
+        for cell in game_object.get_cells():
+            assert game.free_cells.occupied_by(cell, game_object.layer), (
+                'Слои занятости должны совпадать с клетками объектов.'
+            )
+    layers = game.free_cells.planes[:engine.HEAD_PLANE * game.free_cells.area]
+    assert sum(layers) == sum(
+        game.free_cells.counts.values()
+    )
+
+
+def test_board_version_changes_when_food_or_walls_move(engine):
+    import random
+    game = engine.Game(difficulty=2, seed=4)
+    controls = random.Random(4)
+
+    def layout():
+        return (game.apple.position, [fig.position for fig in game.figs],
+                [cell for wall in game.obstacles for cell in wall.positions])
+
+    changes = 0
+    for tick in range(3000):
+        before, version = layout(), game.board_version
+        game.step(controls.choice(engine.DIRECTIONS),
+                  1 + tick // 700 % 2 if tick % 700 == 0 else None)
+        if layout() != before:
+            changes += 1
+            assert game.board_version != version, (
+                'Номер расстановки должен меняться вместе с едой и стенами.'
+            )
+    assert changes
+
+
+def test_board_version_changes_when_reset_snake_eats_fig(engine):
+    game = engine.Game(difficulty=2, seed=4)
+    for stone_wall in game.walls:
+        stone_wall.remove_from_board()
+    fig = game.figs[0]
+    game.snake.length = 5
+    for direction in (engine.RIGHT,) * 3 + (engine.DOWN, engine.LEFT):
+        game.step(direction)
+    fig.place(game.start)
+    version = game.board_version
+    # Змейка врезается в себя, сбрасывается на начальную клетку
+    # и съедает там инжир
+    game.step(engine.UP)
+    assert game.crash_cause == engine.CRASH_SELF
+    assert fig.position != game.start
+    assert game.board_version != version, (
+        'Номер расстановки должен меняться, когда инжир переезжает.'
+    )
+
+
+def test_collisions_use_occupancy_layers(engine):
+    game = engine.Game(difficulty=2, seed=1)
+    free_cells = game.free_cells
+    wall_cell = game.stone_wall.positions[4]
+    assert free_cells.cell_layers(wall_cell) & 1 << engine.WALL_LAYER
+    game.stone_wall.remove_from_board()
+    assert not free_cells.occupied_by(wall_cell, engine.WALL_LAYER), (
+        'Убранная стена должна исчезать из слоя стен.'
+    )
+    assert engine.check_wall_bump(game.snake, game.stone_wall) is False
+    game.stone_wall.place(game.snake.get_head_position())
+    assert engine.check_wall_bump(game.snake, game.stone_wall) is True
+    fig = game.figs[0]
+    game.snake.positions.appendleft(fig.position)
+    engine.check_figs(game.snake, game.figs)
+    assert fig.position != game.snake.get_head_position(), (
+        'Съеденный инжир должен переноситься на другую клетку.'
+    )
+    assert free_cells.occupied_by(fig.position, engine.FIG_LAYER)
+
+
+def test_difficulty_levels_follow_table(engine):
+    game = engine.Game()
+    for _ in range(5000):
+        for difficulty, level in engine.DIFFICULTY_LEVELS.items():
+            game.set_difficulty(difficulty)
+    for difficulty, level in engine.DIFFICULTY_LEVELS.items():
+        game.set_difficulty(difficulty)
+        assert game.speed == level['speed']
+        assert len(game.figs) == level['figs'], (
+            'Количество инжиров должно совпадать с таблицей уровней.'
+        )
+        assert len(game.walls) == level['walls'], (
+            'Количество стен должно совпадать с таблицей уровней.'
+        )
+        assert game.stone_wall is (game.walls[0] if game.walls else None)
+
+
+@pytest.mark.parametrize('board_size', [(32, 24), (2000, 2000)])
+def test_free_neighbours_read_layers_across_edges(engine, board_size):
+    free_cells = engine.FreeCells(board_size=board_size)
+    size = engine.GRID_SIZE
+    right = (free_cells.width - size, 0)
+    corner = (0, 0)
+    free_cells.occupy(right, engine.WALL_LAYER)
+    free_cells.occupy((0, size), engine.FIG_LAYER)
+    free_cells.occupy((0, free_cells.height - size), engine.SNAKE_LAYER)
+
+    def free(*layers):
+        return dict(free_cells.free_neighbours(corner, layers))
+
+    assert free(engine.WALL_LAYER) == {
+        engine.UP: (0, free_cells.height - size), engine.DOWN: (0, size),
+        engine.RIGHT: (size, 0)}, 'Сосед слева за краем поля - стена.'
+    assert free(engine.WALL_LAYER, engine.FIG_LAYER,
+                engine.SNAKE_LAYER) == {engine.RIGHT: (size, 0)}
+    assert len(free(engine.APPLE_LAYER)) == 4
+    free_cells.release(right, engine.WALL_LAYER)
+    assert free(engine.WALL_LAYER)[engine.LEFT] == right
+
+
+def test_crowded_level_resolves_collisions_by_index(engine, monkeypatch):
+    monkeypatch.setitem(
+        engine.DIFFICULTY_LEVELS, 3, {'speed': 1, 'figs': 300, 'walls': 24}
+    )
+    game = engine.Game(difficulty=3, seed=2)
+    assert len(game.figs) == 300 and len(game.walls) == 24
+    eaten = crashes = 0
+    for _ in range(2000):
+        figs = {fig.position for fig in game.figs}
+        game.move_snake(game.rng.choice(engine.DIRECTIONS))
+        head = game.snake.get_head_position()
+        eaten += head in figs
+        if game.check_events():
+            crashes += game.crash_cause == engine.CRASH_WALL
+        else:
+            assert head not in {fig.position for fig in game.figs}
+    assert eaten and crashes, 'На уровне с сотнями инжиров змейка их ест.'
+    owners = game.free_cells.owners[engine.FIG_LAYER]
+    assert {fig.position: fig for fig in game.figs} == owners, (
+        'Индекс клеток должен указывать на инжир в каждой его клетке.'
+    )
+
+
+def test_large_board_wraps_and_stays_sparse(engine):
+    tracemalloc.start()
+    game = engine.Game(difficulty=2, seed=3, board_size=(2000, 2000))
+    assert game.snake.get_head_position() == (
+        1000 * engine.GRID_SIZE, 1000 * engine.GRID_SIZE
+    )
+    for _ in range(1500):
+        game.step()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    assert peak < 1 << 20, (
+        'Партия на большом поле должна занимать память по посещенным '
+        'клеткам, а не по размеру поля.'
+    )
+    assert game.crash_cause is None
+    x, _ = game.snake.get_head_position()
+    assert x == 500 * engine.GRID_SIZE, (
+        'Змейка должна переходить через край большого поля.'
+    )
+    free_cells = game.free_cells
+    assert len(free_cells) + len(free_cells.counts) == 2000 * 2000
+    assert len(free_cells.order) <= 2 * game.ticks + 100, (
+        'Индекс свободных клеток должен расти с числом посещенных клеток, '
+        'а не с размером поля.'
+    )
+
+
+@pytest.mark.parametrize('clone', [
+    copy.deepcopy, lambda game: pickle.loads(pickle.dumps(game)),
+])
+def test_game_survives_copy_and_pickle(engine, clone):
+    game = engine.Game(difficulty=2, seed=4)
+    for _ in range(200):
+        game.step()
+    twin = clone(game)
+    assert twin.free_cells is not game.free_cells
+    assert twin.snake.positions.free_cells is twin.free_cells
+    assert twin.free_cells.counts == game.free_cells.counts, (
+        'Копия не должна заново отмечать клетки тела в индексе.'
+    )
+    assert twin.free_cells.planes == game.free_cells.planes
+    for _ in range(300):
+        game.step()
+        twin.step()
+    assert list(twin.snake.positions) == list(game.snake.positions)
+    assert twin.apple.position == game.apple.position
+    assert twin.free_cells.planes == game.free_cells.planes
@@ -0,0 +1,23 @@
+import pytest
+
+
+@pytest.fixture
+def game(_the_snake):
+    return _the_snake.SnakeGame()
+
+
+def test_simulate_uses_fixed_timestep(_the_snake, game):
+    tick_time = 1000 / game.speed
+    ticks, rest = _the_snake.simulate(game, tick_time * 2.5)
+    assert ticks == 2, (
+        'Убедитесь, что за кадр исполняются все накопившиеся тики игры.'
+    )
+    assert rest == pytest.approx(tick_time / 2)
+
+
+def test_simulate_limits_catch_up(_the_snake, game):
+    ticks, rest = _the_snake.simulate(game, 10 ** 6)
+    max_ticks = _the_snake.MAX_SIMULATION_LAG * game.speed // 1000
+    assert ticks == max_ticks, (
+        'Отставание симуляции должно ограничиваться MAX_SIMULATION_LAG.'
+    )
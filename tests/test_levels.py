@@ -0,0 +1,129 @@
+import os
+import random
+
+import pytest
+
+PACK = '''
+; Тестовый пакет уровней
+[1]
+speed = 10
+figs = 1
+
+[2]
+speed = 20
+figs = 3
+walls = 1
+map =
+    ########
+    #S.....#
+    #--....#
+    ########
+'''
+
+MAZE = os.path.join(os.path.dirname(os.path.dirname(__file__)),
+                    'levels', 'maze.ini')
+
+
+@pytest.fixture
+def levels(tmp_path):
+    from snake_levels import load_levels
+    path = tmp_path / 'pack.ini'
+    path.write_text(PACK, encoding='utf-8')
+    return load_levels(str(path))
+
+
+def expected_counts(game):
+    counts = {}
+    for game_object in game.get_objects():
+        for cell in game_object.get_cells():
+            counts[cell] = counts.get(cell, 0) + 1
+    if game.level_map is not None:
+        for cell in game.level_map.reserved:
+            counts[cell] = counts.get(cell, 0) + 1
+    return counts
+
+
+def test_level_pack_precomputes_masks(levels, tmp_path):
+    from snake_engine import GRID_SIZE, GRID_HEIGHT
+    from snake_levels import load_levels
+    assert levels[1] == {'speed': 10, 'figs': 1, 'walls': 0}
+    level = levels[2]
+    assert len(level['wall_cells']) == 20
+    assert set(level['reserved']) == {(GRID_SIZE, 2 * GRID_SIZE),
+                                      (2 * GRID_SIZE, 2 * GRID_SIZE)}
+    assert level['spawn'] == (GRID_SIZE, GRID_SIZE)
+    assert (0, 0) in level['wall_cells']
+    assert 'collision_mask' not in level
+    assert level['free_mask'][GRID_HEIGHT + 1] == 1
+    assert load_levels(str(tmp_path / 'pack.ini')) is levels, (
+        'Пакет уровней должен разбираться один раз.'
+    )
+
+
+def test_level_map_rejects_bad_cells(tmp_path):
+    from snake_engine import GRID_HEIGHT, GRID_WIDTH
+    from snake_levels import load_levels
+    path = tmp_path / 'bad.ini'
+    path.write_text('[2]\n[1]\nmap =\n    #?#\n', encoding='utf-8')
+    with pytest.raises(ValueError):
+        load_levels(str(path))
+    path.write_text('[2]\n[1]\nmap =\n    ' + '.' * 100 + '\n',
+                    encoding='utf-8')
+    with pytest.raises(ValueError):
+        load_levels(str(path))
+    # Без S змейка начинает в середине поля, а там стена
+    rows = ['.' * GRID_WIDTH] * (GRID_HEIGHT // 2)
+    rows.append('.' * (GRID_WIDTH // 2) + '#')
+    path.write_text('[2]\n[1]\nmap =\n' + ''.join(
+        f'    {row}\n' for row in rows), encoding='utf-8')
+    with pytest.raises(ValueError):
+        load_levels(str(path))
+
+
+def test_level_pack_needs_levels_for_both_keys(tmp_path):
+    from snake_levels import load_levels
+    path = tmp_path / 'single.ini'
+    path.write_text('[1]\nspeed = 10\n', encoding='utf-8')
+    with pytest.raises(ValueError):
+        load_levels(str(path))
+
+
+def test_switching_levels_keeps_index_and_food_off_map(levels):
+    from snake_engine import CRASH_WALL, DIRECTIONS, Game
+    game = Game(2, seed=3, levels=levels)
+    assert game.snake.get_head_position() == levels[2]['spawn']
+    free_mask = levels[2]['free_mask']
+    controls = random.Random(2)
+    crashes = 0
+    for tick in range(3000):
+        if tick % 100 == 0:
+            game.set_difficulty(controls.choice((1, 2)))
+        game.step(controls.choice(DIRECTIONS))
+        crashes += game.crash_cause == CRASH_WALL
+        assert game.free_cells.counts == expected_counts(game)
+        if game.level_map is not None:
+            for food in (game.apple, *game.figs):
+                assert free_mask[game.free_cells.cell_number(food.position)]
+    assert crashes, 'Змейка должна разбиваться о стены карты.'
+
+
+def test_snapshot_restores_level_map(levels):
+    from snake_engine import DIRECTIONS, Game
+    from snake_snapshot import restore_state, save_state
+    game = Game(2, seed=4, levels=levels)
+    controls = random.Random(3)
+    for _ in range(300):
+        game.step(controls.choice(DIRECTIONS))
+    state = save_state(game)
+    game.set_difficulty(1)
+    restore_state(game, state)
+    assert game.level_map is not None
+    assert game.free_cells.counts == expected_counts(game)
+
+
+def test_maze_pack_loads_for_default_board():
+    from snake_engine import Game
+    from snake_levels import load_levels
+    levels = load_levels(MAZE)
+    game = Game(2, seed=1, levels=levels)
+    assert game.level_map.positions is levels[2]['wall_cells']
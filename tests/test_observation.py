@@ -0,0 +1,73 @@
+import random
+
+import numpy as np
+import pytest
+
+
+def expected_planes(game):
+    from snake_engine import GRID_SIZE, HEAD_PLANE, PLANES
+    planes = np.zeros((len(PLANES), *game.board_size), dtype=np.uint8)
+    for game_object in game.get_objects():
+        for x, y in game_object.get_cells():
+            planes[game_object.layer, x // GRID_SIZE, y // GRID_SIZE] += 1
+    x, y = game.snake.get_head_position()
+    planes[HEAD_PLANE, x // GRID_SIZE, y // GRID_SIZE] += 1
+    return planes
+
+
+def test_grid_planes_follow_game_without_copies():
+    from snake_engine import DIRECTIONS, Game
+    from snake_observation import PLANE_NAMES, grid_planes
+    game = Game(difficulty=2, seed=8)
+    planes = grid_planes(game)
+    assert planes.shape == (len(PLANE_NAMES), *game.board_size)
+    controls = random.Random(5)
+    for tick in range(2000):
+        game.step(controls.choice(DIRECTIONS))
+        if tick % 50 == 0:
+            assert np.array_equal(planes, expected_planes(game)), (
+                'Плоскости должны меняться вместе с партией.'
+            )
+    with pytest.raises(ValueError):
+        planes[0, 0, 0] = 1
+
+
+def test_grid_planes_survive_snapshot_restore():
+    from snake_engine import DIRECTIONS, Game
+    from snake_observation import grid_planes
+    from snake_snapshot import restore_state, save_state
+    game = Game(difficulty=2, seed=9)
+    planes = grid_planes(game)
+    controls = random.Random(6)
+    for _ in range(300):
+        game.step(controls.choice(DIRECTIONS))
+    state = save_state(game)
+    for _ in range(300):
+        game.step(controls.choice(DIRECTIONS))
+    restore_state(game, state)
+    assert np.array_equal(planes, expected_planes(game))
+
+
+def test_screen_pixels_reference_screen(_the_snake):
+    import pygame
+    from snake_observation import screen_pixels
+    _the_snake.init_display()
+    game = _the_snake.SnakeGame(seed=3)
+    _the_snake.setup_board(game)
+    _the_snake.render_frame(game)
+    x, y = game.apple.position
+    with screen_pixels(_the_snake.screen) as pixels:
+        assert tuple(pixels[x + 5, y + 5]) == game.apple.body_color
+        expected = pygame.surfarray.array3d(_the_snake.screen)
+        assert np.array_equal(pixels, expected)
+        del pixels
+    assert not _the_snake.screen.get_locked(), (
+        'После блока with экран должен быть снова доступен для отрисовки.'
+    )
+
+
+def test_grid_planes_need_dense_board():
+    from snake_engine import Game
+    from snake_observation import grid_planes
+    with pytest.raises(ValueError):
+        grid_planes(Game(seed=1, board_size=(2000, 2000)))
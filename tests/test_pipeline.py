@@ -0,0 +1,81 @@
+import random
+import threading
+import time
+
+import pygame
+import pytest
+
+
+def test_simulation_ticks_while_reader_is_slow():
+    from snake_engine import Game
+    from snake_pipeline import Simulation
+    game = Game(seed=1)
+    game.speed = 500
+    simulation = Simulation(game, lambda game: game.step())
+    assert simulation.buffer.latest().tick == 0
+    simulation.start()
+    # Медленная отрисовка не держит симуляцию
+    time.sleep(0.2)
+    simulation.stop()
+    simulation.check()
+    snapshot = simulation.buffer.latest()
+    assert game.ticks > 30, (
+        'Симуляция должна идти, пока отрисовка занята.'
+    )
+    assert snapshot.tick == game.ticks
+    assert snapshot.snake == tuple(game.snake.positions)
+    assert snapshot.apple == game.apple.position
+
+
+def test_simulation_applies_commands_and_reports_errors():
+    from snake_engine import UP, Game
+    from snake_pipeline import Simulation
+    game = Game(seed=2)
+    game.speed = 1000
+    threads = []
+
+    def command(game, direction):
+        threads.append(threading.current_thread().name)
+        game.snake.turn(direction)
+
+    def tick(game):
+        if game.ticks == 20:
+            raise RuntimeError('tick')
+        game.step()
+
+    simulation = Simulation(game, tick)
+    simulation.submit(command, UP)
+    simulation.start()
+    simulation.join(5)
+    assert threads == ['simulation'], (
+        'Команды ввода должны применяться в потоке симуляции.'
+    )
+    assert game.snake.direction == UP
+    with pytest.raises(RuntimeError):
+        simulation.check()
+
+
+def test_snapshot_renderer_matches_frame_rendering(_the_snake):
+    from snake_engine import DIRECTIONS
+    from snake_pipeline import Simulation
+    _the_snake.init_display()
+    moves = [random.Random(4).choice(DIRECTIONS) for _ in range(300)]
+    game = _the_snake.SnakeGame(2, seed=6)
+    _the_snake.setup_board(game)
+    for direction in moves:
+        game.snake.turn(direction)
+        _the_snake.game_tick(game)
+        _the_snake.render_frame(game)
+    expected = pygame.image.tobytes(_the_snake.screen, 'RGB')
+    game = _the_snake.PipelinedGame(2, seed=6)
+    simulation = Simulation(game, _the_snake.game_tick)
+    renderer = _the_snake.SnapshotRenderer()
+    for tick, direction in enumerate(moves):
+        game.snake.turn(direction)
+        _the_snake.game_tick(game)
+        simulation.buffer.publish(simulation.snapshot())
+        if tick % 3 == 0 or tick == len(moves) - 1:
+            renderer.render(simulation.buffer.latest(), game)
+    assert pygame.image.tobytes(_the_snake.screen, 'RGB') == expected, (
+        'Отрисовка по снимкам должна давать тот же экран.'
+    )
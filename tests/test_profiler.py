@@ -0,0 +1,31 @@
+import csv
+import json
+
+from snake_profiler import FrameProfiler, SampleRing
+
+
+def test_sample_ring_keeps_last_samples():
+    ring = SampleRing(size=100)
+    for value in range(1000):
+        ring.add(float(value))
+    assert ring.count == 100
+    assert ring.percentile(50) == 950.0, (
+        'Буфер должен хранить только последние замеры.'
+    )
+    assert ring.summary()['max'] == 999.0
+
+
+def test_profiler_export(tmp_path):
+    profiler = FrameProfiler()
+    for value in (1.0, 2.0, 30.0):
+        profiler.add('frame', value)
+    profiler.dropped_ticks = 2
+    profiler.export(tmp_path / 'profile.json')
+    summary = json.loads((tmp_path / 'profile.json').read_text())
+    assert summary['phases']['frame']['p50'] == 2.0
+    assert summary['dropped_ticks'] == 2
+    profiler.export(tmp_path / 'profile.csv')
+    with open(tmp_path / 'profile.csv') as file:
+        rows = list(csv.reader(file))
+    assert rows[0] == ['phase', 'count', 'p50', 'p99', 'max']
+    assert rows[-1] == ['dropped_ticks', '2']
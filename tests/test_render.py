@@ -0,0 +1,118 @@
+import random
+
+import pygame
+
+
+def screen_bytes(the_snake):
+    return pygame.image.tobytes(the_snake.screen, 'RGB')
+
+
+def difference(actual, expected):
+    # Число различающихся байтов: разбор сравнения мегабайтных кадров
+    # средствами pytest занял бы минуты
+    return (sum(a != b for a, b in zip(actual, expected))
+            + abs(len(actual) - len(expected)))
+
+
+def play_and_render(the_snake, game, ticks, seed):
+    from snake_engine import DIRECTIONS
+    controls = random.Random(seed)
+    for _ in range(ticks):
+        game.snake.turn(controls.choice(DIRECTIONS))
+        the_snake.game_tick(game)
+        the_snake.render_frame(game)
+
+
+def redraw_bytes(the_snake, game):
+    the_snake.redraw_board(game)
+    the_snake.render_frame(game)
+    return screen_bytes(the_snake)
+
+
+def board_surface(the_snake, game):
+    from snake_engine import BORDER_COLOR, GRID_SIZE
+    board = pygame.Surface((game.free_cells.width, game.free_cells.height))
+    board.fill(the_snake.BOARD_BACKGROUND_COLOR)
+    walls = game.obstacles
+    for game_object in (*walls, *(o for o in game.get_objects()
+                                  if o not in walls)):
+        sprite = the_snake.get_cell_sprite(game_object.body_color,
+                                           BORDER_COLOR)
+        for cell in game_object.get_cells():
+            board.blit(sprite, cell, pygame.Rect(0, 0, GRID_SIZE, GRID_SIZE))
+    return board
+
+
+def assert_chunks_match_board(the_snake, game):
+    chunk_board = the_snake.chunk_board
+    board = board_surface(the_snake, game)
+    assert chunk_board.chunks
+    for (column, row), (surface, _) in chunk_board.chunks.items():
+        rect = surface.get_rect(topleft=(column * chunk_board.chunk_size,
+                                         row * chunk_board.chunk_size))
+        changed = difference(
+            pygame.image.tobytes(surface, 'RGB'),
+            pygame.image.tobytes(board.subsurface(rect), 'RGB'))
+        assert changed == 0, (
+            'Кусок должен совпадать с тем же местом поля.'
+        )
+
+
+def test_chunks_match_board_on_large_board(_the_snake):
+    _the_snake.init_display()
+    game = _the_snake.SnakeGame(2, seed=5, board_size=(90, 70))
+    _the_snake.setup_board(game)
+    chunk_board = _the_snake.chunk_board
+    play_and_render(_the_snake, game, 400, seed=7)
+    assert chunk_board.statics, 'Стены должны быть разложены по кускам.'
+    for key, cells in chunk_board.statics.items():
+        assert all(chunk_board.chunk_key(cell) == key for _, cell in cells)
+    assert_chunks_match_board(_the_snake, game)
+    frame = screen_bytes(_the_snake)
+    changed = difference(redraw_bytes(_the_snake, game), frame)
+    assert changed == 0, (
+        'Куски из кэша должны совпадать с заново построенными.'
+    )
+    assert_chunks_match_board(_the_snake, game)
+
+
+def test_incremental_frames_match_full_redraw(_the_snake):
+    _the_snake.init_display()
+    game = _the_snake.SnakeGame(seed=11)
+    _the_snake.setup_board(game)
+    _the_snake.render_frame(game)
+    for round in range(6):
+        play_and_render(_the_snake, game, 5 + 40 * round, seed=round)
+        frame = screen_bytes(_the_snake)
+        changed = difference(redraw_bytes(_the_snake, game), frame)
+        assert changed == 0, (
+            'Кадр, нарисованный по изменениям, должен совпадать '
+            'с полной перерисовкой.'
+        )
+
+
+def test_incremental_frames_match_full_redraw_with_walls(_the_snake):
+    from snake_engine import GRID_SIZE
+    _the_snake.init_display()
+    game = _the_snake.SnakeGame(seed=12)
+    _the_snake.setup_board(game)
+    _the_snake.render_frame(game)
+    play_and_render(_the_snake, game, 30, seed=20)
+    # Смена уровня ставит стены, они рисуются в фон поля
+    game.set_difficulty(2)
+    _the_snake.render_frame(game)
+    assert game.obstacles
+    for round in range(6):
+        play_and_render(_the_snake, game, 5 + 40 * round, seed=30 + round)
+        for stone_wall in game.obstacles:
+            for x, y in stone_wall.get_cells():
+                center = (x + GRID_SIZE // 2, y + GRID_SIZE // 2)
+                assert (_the_snake.background.get_at(center)[:3]
+                        == stone_wall.body_color), (
+                    'Стены должны быть нарисованы в фон поля.'
+                )
+        frame = screen_bytes(_the_snake)
+        changed = difference(redraw_bytes(_the_snake, game), frame)
+        assert changed == 0, (
+            'Кадр со стенами в фоне должен совпадать с полной перерисовкой.'
+        )
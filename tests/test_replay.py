@@ -0,0 +1,80 @@
+import os
+import random
+import shutil
+
+import pytest
+
+from snake_engine import DIRECTIONS, Game
+from snake_levels import load_levels, pack_digest
+from snake_replay import Replay, replay_headless
+
+MAZE = os.path.join(os.path.dirname(os.path.dirname(__file__)),
+                    'levels', 'maze.ini')
+
+
+def play_recorded_game(seed, ticks=3000, board_size=(32, 24),
+                       levels_path=None):
+    levels = None if levels_path is None else load_levels(levels_path)
+    game = Game(seed=seed, board_size=board_size, levels=levels)
+    replay = Replay(game.seed, game.difficulty, board_size=board_size,
+                    levels_digest=pack_digest(levels_path))
+    controls = random.Random(seed)
+    for _ in range(ticks):
+        # Иногда за тик приходит несколько нажатий - они ждут в очереди
+        for _ in range(controls.choice((0, 0, 0, 1, 2))):
+            game.snake.turn(controls.choice(DIRECTIONS))
+        if controls.randrange(500) == 0:
+            game.next_difficulty = controls.choice((1, 2))
+        replay.record(game)
+        game.step()
+    return game, replay
+
+
+def test_replay_reproduces_game():
+    game, replay = play_recorded_game(seed=7)
+    replayed = replay_headless(Replay.from_bytes(replay.to_bytes()))
+    assert list(replayed.snake.positions) == list(game.snake.positions), (
+        'Повтор записи должен приводить к той же партии.'
+    )
+    assert replayed.apple.position == game.apple.position
+    assert (replayed.ticks, replayed.score) == (game.ticks, game.score)
+
+
+def test_replay_uses_one_byte_per_tick():
+    game, replay = play_recorded_game(seed=1, ticks=100)
+    assert len(replay.to_bytes()) == len(Replay(0).to_bytes()) + 100
+
+
+def test_replay_rejects_foreign_and_short_data():
+    data = Replay(0).to_bytes()
+    for bad_data in (b'XXXX' + data[4:], data[:10], b''):
+        with pytest.raises(ValueError):
+            Replay.from_bytes(bad_data)
+
+
+def test_replay_keeps_board_size():
+    game, replay = play_recorded_game(seed=3, ticks=500,
+                                      board_size=(90, 70))
+    replayed = replay_headless(Replay.from_bytes(replay.to_bytes()))
+    assert replayed.board_size == (90, 70), (
+        'Запись должна хранить размер поля.'
+    )
+    assert list(replayed.snake.positions) == list(game.snake.positions)
+
+
+def test_replay_requires_its_level_pack(tmp_path):
+    pack = tmp_path / 'maze.ini'
+    shutil.copy(MAZE, pack)
+    game, replay = play_recorded_game(seed=5, ticks=1500,
+                                      levels_path=str(pack))
+    replay = Replay.from_bytes(replay.to_bytes())
+    replayed = replay_headless(replay, str(pack))
+    assert list(replayed.snake.positions) == list(game.snake.positions), (
+        'Повтор с тем же пакетом уровней должен приводить к той же партии.'
+    )
+    with pytest.raises(ValueError):
+        replay_headless(replay)
+    with open(pack, 'a', encoding='utf-8') as file:
+        file.write('\n[3]\nspeed = 30\n')
+    with pytest.raises(ValueError):
+        replay_headless(replay, str(pack))
@@ -0,0 +1,106 @@
+import asyncio
+import json
+import random
+
+from snake_engine import DIRECTIONS
+from snake_server import Arena, ArenaServer, to_cell
+
+
+def apply_delta(snakes, food, delta):
+    """Повторяет дельту арены на стороне игрока."""
+    for snake_id in delta['left']:
+        del snakes[snake_id]
+    for snake_id, x, y in delta['joined']:
+        snakes[snake_id] = [[x, y]]
+    for snake_id, x, y in delta['heads']:
+        snakes[snake_id].insert(0, [x, y])
+    for snake_id, x, y in delta['tails']:
+        assert snakes[snake_id].pop() == [x, y]
+    for i, x, y in delta['food']:
+        food[i] = [x, y]
+    for snake_id, x, y in delta['spawned']:
+        snakes[snake_id] = [[x, y]]
+
+
+def test_deltas_reproduce_arena():
+    arena = Arena(board_size=(30, 20), apples=10, seed=1)
+    controls = random.Random(1)
+    ids = [arena.add_snake() for _ in range(10)]
+    snapshot = json.loads(json.dumps(arena.snapshot()))
+    snakes = {snake_id: cells for snake_id, cells in snapshot['snakes']}
+    food = snapshot['food']
+    for tick in range(300):
+        if tick == 100:
+            arena.remove_snake(ids.pop())
+        if tick == 200:
+            ids.append(arena.add_snake())
+        for snake_id in ids:
+            if controls.randrange(3) == 0:
+                arena.turn(snake_id, controls.choice(DIRECTIONS))
+        apply_delta(snakes, food, json.loads(json.dumps(arena.step())))
+    expected = {
+        snake_id: [list(to_cell(cell)) for cell in snake.positions]
+        for snake_id, snake in arena.snakes.items()
+    }
+    assert snakes == expected, (
+        'Дельты тиков должны восстанавливать поле арены у игрока.'
+    )
+    assert food == [list(to_cell(apple.position)) for apple in arena.apples]
+
+
+def test_snake_joining_and_leaving_in_one_tick_is_not_sent():
+    arena = Arena(board_size=(20, 20), apples=3, seed=4)
+    stays = arena.add_snake()
+    snapshot = arena.snapshot()
+    snakes = {snake_id: [list(cell) for cell in cells]
+              for snake_id, cells in snapshot['snakes']}
+    food = [list(cell) for cell in snapshot['food']]
+    apply_delta(snakes, food, arena.step())
+    arena.remove_snake(arena.add_snake())
+    delta = arena.step()
+    assert delta['joined'] == [] and delta['left'] == [], (
+        'Змейка, пришедшая и ушедшая в одном тике, не должна попадать '
+        'в дельту.'
+    )
+    apply_delta(snakes, food, delta)
+    assert list(snakes) == [stays]
+
+
+def test_head_on_collision_respawns_both_snakes():
+    arena = Arena(board_size=(10, 10), apples=0, seed=2)
+    left, right = arena.add_snake(), arena.add_snake()
+    for snake_id, cell in ((left, (0, 100)), (right, (40, 100))):
+        snake = arena.snakes[snake_id]
+        snake.positions.clear()
+        snake.positions.append(cell)
+    arena.snakes[right].direction = DIRECTIONS[2]
+    delta = arena.step()
+    assert sorted(snake_id for snake_id, *_ in delta['spawned']) == [
+        left, right
+    ], 'Змейки, столкнувшиеся лбами, должны начать заново.'
+
+
+def test_server_sends_snapshot_and_deltas():
+    async def session():
+        server = ArenaServer(Arena(board_size=(20, 20), seed=3), speed=50)
+        listener = await asyncio.start_server(server.handle_client,
+                                              'localhost', 0)
+        port = listener.sockets[0].getsockname()[1]
+        ticks = asyncio.create_task(server.run_ticks())
+        reader, writer = await asyncio.open_connection('localhost', port)
+        hello = json.loads(await reader.readline())
+        writer.write(b'up\n')
+        deltas = [json.loads(await reader.readline()) for _ in range(5)]
+        writer.close()
+        ticks.cancel()
+        listener.close()
+        return hello, deltas
+
+    hello, deltas = asyncio.run(session())
+    you = hello['you']
+    assert [you] == [snake_id for snake_id, _ in hello['snapshot']['snakes']]
+    heads = [head for delta in deltas for head in delta['heads']
+             if head[0] == you]
+    assert heads and heads[-1][2] != heads[0][2], (
+        'Змейка игрока должна повернуть по команде с сервера.'
+    )
@@ -0,0 +1,92 @@
+import random
+
+import pytest
+
+
+@pytest.fixture
+def snapshot():
+    import snake_snapshot
+    return snake_snapshot
+
+
+def play(game, moves):
+    for direction in moves:
+        game.step(direction)
+    return (
+        list(game.snake.positions), game.snake.direction, game.snake.length,
+        game.apple.position, [fig.position for fig in game.figs],
+        game.stone_wall and game.stone_wall.positions, game.ticks,
+        game.score, game.rng.getstate(), dict(game.free_cells.counts),
+        bytes(game.free_cells.planes),
+    )
+
+
+@pytest.mark.parametrize('difficulty', [1, 2])
+def test_restored_game_continues_identically(snapshot, difficulty):
+    from snake_engine import DIRECTIONS, Game
+    game = Game(difficulty=difficulty, seed=5)
+    controls = random.Random(1)
+    play(game, [controls.choice(DIRECTIONS) for _ in range(700)])
+    state = snapshot.save_state(game)
+    moves = [controls.choice(DIRECTIONS) for _ in range(500)]
+    expected = play(game, moves)
+    snapshot.restore_state(game, state)
+    assert play(game, moves) == expected, (
+        'После восстановления партия должна повторяться ход в ход.'
+    )
+    assert play(snapshot.load_state(state), moves) == expected
+
+
+def test_snapshot_branches_from_one_state(snapshot):
+    from snake_engine import DIRECTIONS, Game
+    game = Game(difficulty=2, seed=7)
+    play(game, [None] * 50)
+    state = snapshot.save_state(game)
+    results = {}
+    for direction in DIRECTIONS:
+        snapshot.restore_state(game, state)
+        results[direction] = play(game, [direction] * 20)
+    for direction in DIRECTIONS:
+        snapshot.restore_state(game, state)
+        assert play(game, [direction] * 20) == results[direction]
+    assert snapshot.save_state(snapshot.load_state(state)) == state
+
+
+def test_snapshot_rejects_foreign_data(snapshot):
+    from snake_engine import Game
+    state = snapshot.save_state(Game(seed=1))
+    assert len(state) < 4096, 'Снимок новой партии должен быть компактным.'
+    with pytest.raises(ValueError):
+        snapshot.restore_state(Game(board_size=(40, 30)), state)
+    with pytest.raises(ValueError):
+        snapshot.restore_state(Game(), b'XXXX' + state[4:])
+    with pytest.raises(ValueError):
+        snapshot.load_state(state[:10])
+
+
+def test_failed_restore_leaves_game_unchanged(snapshot):
+    from snake_engine import DIFFICULTY_LEVELS, DIRECTIONS, Game
+    game = Game(difficulty=2, seed=3)
+    controls = random.Random(2)
+    play(game, [controls.choice(DIRECTIONS) for _ in range(200)])
+    other = Game(difficulty=1, seed=9)
+    play(other, [None] * 30)
+    state = snapshot.save_state(other)
+    # Уровень 1 с двумя инжирами вместо одного
+    levels = {**DIFFICULTY_LEVELS, 1: {**DIFFICULTY_LEVELS[1], 'figs': 2}}
+    before = play(game, [])
+    bad_states = (
+        b'XXXX' + state[4:],
+        snapshot.save_state(Game(seed=9, board_size=(40, 30))),
+        state[:9] + bytes([9]) + state[10:],
+        state[:len(state) // 2],
+        state[:-1],
+        snapshot.save_state(Game(difficulty=1, seed=4, levels=levels)),
+    )
+    for bad_state in bad_states:
+        with pytest.raises(ValueError):
+            snapshot.restore_state(game, bad_state)
+        assert play(game, []) == before, (
+            'Отвергнутый снимок не должен менять партию.'
+        )
+        assert game.seed == 3
@@ -0,0 +1,54 @@
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+from conftest import BASE_DIR
+
+# Сколько секунд может занимать импорт модуля
+IMPORT_BUDGET = {'snake_engine': 0.5, 'the_snake': 1.0}
+
+IMPORT_SCRIPT = '''
+import json
+import sys
+import time
+start = time.perf_counter()
+module = __import__({module!r})
+elapsed = time.perf_counter() - start
+pygame = sys.modules.get('pygame')
+print(json.dumps({{
+    'elapsed': elapsed,
+    'display': pygame is not None and pygame.display.get_init(),
+    'clock': 'clock' in vars(module),
+}}))
+'''
+
+
+def import_in_subprocess(module):
+    output = subprocess.run(
+        [sys.executable, '-c', IMPORT_SCRIPT.format(module=module)],
+        cwd=BASE_DIR, capture_output=True, text=True, check=True,
+        env=dict(os.environ, PYGAME_HIDE_SUPPORT_PROMPT='1'),
+    ).stdout
+    return json.loads(output.splitlines()[-1])
+
+
+@pytest.mark.parametrize('module', IMPORT_BUDGET)
+def test_import_is_cheap_and_has_no_side_effects(module):
+    result = import_in_subprocess(module)
+    assert not result['display'], (
+        f'Импорт `{module}` не должен открывать окно игры.'
+    )
+    assert not result['clock'], (
+        f'Импорт `{module}` не должен создавать часы игры.'
+    )
+    assert result['elapsed'] < IMPORT_BUDGET[module], (
+        f'Импорт `{module}` занял {result["elapsed"]:.2f} с.'
+    )
+
+
+def test_display_is_created_on_first_access(_the_snake):
+    assert _the_snake.screen is _the_snake.screen
+    assert _the_snake.background.get_size() == _the_snake.screen.get_size()
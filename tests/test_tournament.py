@@ -0,0 +1,20 @@
+import snake_tournament
+
+
+def test_play_game_is_reproducible():
+    first = snake_tournament.play_game(
+        snake_tournament.random_controller, seed=3, difficulty=2)
+    second = snake_tournament.play_game(
+        snake_tournament.random_controller, seed=3, difficulty=2)
+    assert first == second, (
+        'Партии с одинаковым seed должны давать одинаковый результат.'
+    )
+    assert set(first) == {'seed', 'score', 'length', 'ticks', 'death'}
+
+
+def test_run_tournament_returns_record_per_game():
+    records = list(snake_tournament.run_tournament(
+        'snake_tournament:keep_direction', range(4), max_ticks=50,
+        workers=2))
+    assert sorted(record['seed'] for record in records) == [0, 1, 2, 3]
+    assert all(record['ticks'] <= 50 for record in records)
@@ -1,212 +1,215 @@
-from random import randrange
+import argparse
+import os
+from collections import OrderedDict
+from time import perf_counter
+
+# Приветствие pygame при импорте уходит в стандартный вывод - туда же, куда
+# --capture - пишет кадры, поэтому оно выключается до первого импорта
+if 'PYGAME_HIDE_SUPPORT_PROMPT' not in os.environ:
+    os.environ['PYGAME_HIDE_SUPPORT_PROMPT'] = '1'
 
 import pygame as pg
 
-# Константы для размеров поля и сетки:
-SCREEN_WIDTH, SCREEN_HEIGHT = 640, 480
-GRID_SIZE = 20
-GRID_WIDTH = SCREEN_WIDTH // GRID_SIZE
-GRID_HEIGHT = SCREEN_HEIGHT // GRID_SIZE
-SCREEN_MIDDLE = ((SCREEN_WIDTH // 2), (SCREEN_HEIGHT // 2))
-
-# Направления движения:
-UP = (0, -1)
-DOWN = (0, 1)
-LEFT = (-1, 0)
-RIGHT = (1, 0)
-
-# Константы цветов:
-BLACK = (0, 0, 0)
-RED = (255, 0, 0)
-LIGHTBLUE = (93, 216, 228)
-PURPLE = (128, 0, 128)
-GREY = (120, 120, 120)
-GREEN = (0, 255, 0)
-
-# Константы цветов игровых объектов
-BOARD_BACKGROUND_COLOR = BLACK
-BORDER_COLOR = LIGHTBLUE
-APPLE_COLOR = RED
-FIG_COLOR = PURPLE
-WALL_COLOR = GREY
-SNAKE_COLOR = GREEN
-
-# Скорость движения змейки:
-SPEED = 20
-
-# Настройка игрового окна:
-screen = pg.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT), 0, 32)
-
-# Заголовок окна игрового поля:
-pg.display.set_caption('Змейка')
-
-# Настройка времени:
-clock = pg.time.Clock()
-
-
-class GameObject:
-    """Базовый класс, на его основании созданы остальные."""
-
-    def __init__(
-        self, object_color=None, object_position=SCREEN_MIDDLE
-    ) -> None:
-        """
-        Метод инициации объекта. Базовые атрибуты - цвет (body_color)
-        и позиция (position) объекта.
-        """
-        self.body_color = object_color
-        self.position = object_position
+import snake_engine as engine
+from snake_engine import (BOARD_BACKGROUND_COLOR, BORDER_COLOR, DOWN,
+                          GRID_SIZE, LEFT, RIGHT, SCREEN_HEIGHT, SCREEN_WIDTH,
+                          UP)
+# Размеры сетки поля остаются доступны из модуля игры
+from snake_engine import GRID_HEIGHT, GRID_WIDTH
+from snake_autopilot import Autopilot
+from snake_capture import FrameCapture, open_sink
+from snake_levels import load_levels, pack_digest
+from snake_pipeline import MAX_SIMULATION_LAG, Simulation
+from snake_profiler import FrameProfiler
+from snake_replay import Replay
 
-    def draw(self):
-        """Заготовка под наследуемый метод."""
-        raise NotImplementedError(
-            f'{self.__class__.__name__} object method is not implemented')
+# Окно игры (screen), фон поля (background) и часы (clock) создаются
+# не при импорте, а при первом обращении к ним или вызове init_display
+DISPLAY_GLOBALS = ('screen', 'background', 'clock')
+
+# Частота кадров: отрисовка и опрос ввода, не связанные со скоростью игры
+FPS = 60
+
+# Области экрана, изменившиеся за кадр - только они выводятся на дисплей
+dirty_rects = []
+
+# Очередь отрисовки кадра: пары (поверхность, позиция) или тройки
+# (поверхность, позиция, область), выводятся на экран одним вызовом blits
+blit_queue = []
+
+# Через сколько кадров обновляется текст оверлея замеров
+OVERLAY_REFRESH_FRAMES = 30
+
+# Кэш готовых изображений клеток по ключу (цвет заливки, цвет рамки)
+cell_sprites = {}
+
+# Кэш прямоугольников клеток окна по позициям - кадр не создает новых Rect
+cell_rects = {}
+
+# Сторона куска большого поля в клетках и сколько кусков хранится в кэше
+CHUNK_CELLS = 16
+CHUNK_CACHE_SIZE = 48
+
+# Поле больше окна (ChunkBoard) или None, если поле совпадает с окном
+chunk_board = None
+
+
+def init_display():
+    """
+    Функция открывает окно игры и создает часы, если они еще не созданы.
+    Фон поля хранит статичные объекты (стены) - они рисуются в него один раз
+    при появлении, а не в каждом кадре.
+    """
+    global screen, background, clock
+    if 'screen' not in globals():
+        screen = pg.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT), 0, 32)
+        pg.display.set_caption('Змейка')
+        background = pg.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
+    if 'clock' not in globals():
+        clock = pg.time.Clock()
+
+
+def __getattr__(name):
+    """Окно, фон и часы модуля создаются при первом обращении к ним."""
+    if name in DISPLAY_GLOBALS:
+        init_display()
+        return globals()[name]
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+
+
+def get_cell_sprite(color, border_color):
+    """Функция возвращает изображение клетки из кэша, создавая его один раз."""
+    sprite = cell_sprites.get((color, border_color))
+    if sprite is None:
+        sprite = pg.Surface((GRID_SIZE, GRID_SIZE))
+        sprite.fill(color)
+        pg.draw.rect(sprite, border_color, sprite.get_rect(), 1)
+        cell_sprites[(color, border_color)] = sprite
+    return sprite
+
+
+def get_cell_rect(position):
+    """Функция возвращает прямоугольник клетки окна из кэша."""
+    rect = cell_rects.get(position)
+    if rect is None:
+        rect = cell_rects[position] = pg.Rect(position, (GRID_SIZE, GRID_SIZE))
+    return rect
+
+
+def erase_rect(position):
+    """Функция стирает клетку, восстанавливая под ней фон поля."""
+    if chunk_board is not None:
+        chunk_board.erase(position)
+        return
+    rect = get_cell_rect(position)
+    blit_queue.append((background, position, rect))
+    dirty_rects.append(rect)
+
+
+class GameObject(engine.GameObject):
+    """
+    Базовый класс отрисовки. Логика объектов находится в snake_engine,
+    здесь к ней добавляется только рисование на экране.
+    Атрибут drawn_position - позиция, в которой объект нарисован на экране,
+    None - объект нужно нарисовать заново.
+    """
+
+    drawn_position = None
 
     def draw_rect(self, position, color=BOARD_BACKGROUND_COLOR):
-        """Отрисовка прямоугольника в заданной позиции и заданного цвета"""
-        rect = (pg.Rect(position, (GRID_SIZE, GRID_SIZE)))
-        pg.draw.rect(screen, self.body_color, rect)
-        pg.draw.rect(screen, color, rect, 1)
-
-
-class Snake(GameObject):
-    """Класс отвечающий за поведение объекта змейки."""
-
-    def __init__(
-            self, length=1,
-            object_position=SCREEN_MIDDLE,
-            direction=RIGHT,
-            next_direction=None,
-            body_color=SNAKE_COLOR
-    ):
         """
-        Метод инициации экземпяра класса змейки.
-        Атрибут length - максимальная длина змейки в данный момент
-        Атрибут direction - направление змейки
-        Атрибут next_direction - направление в следующий тик
-        Атрибут last - для закрашивания последней клетки при движении
-        Атрибут difficulty - текущий уровень сложности игры, влияет на наличие
-        стены, скорость игры и количество инжиров
+        Отрисовка прямоугольника в заданной позиции и заданного цвета.
+        Клетка берется из кэша и ставится в очередь отрисовки кадра.
         """
-        super().__init__(body_color, object_position)
-        self.next_direction = next_direction
-        self.last = None
-        self.difficulty = 1
-        self.reset()
+        sprite = get_cell_sprite(self.body_color, color)
+        if chunk_board is not None:
+            chunk_board.draw(sprite, position)
+            return
+        blit_queue.append((sprite, position))
+        dirty_rects.append(get_cell_rect(position))
 
-    def draw(self):
-        """Метод визуализации змейки и стирания ее хвоста при движении."""
-        # Отрисовка головы
-        self.draw_rect(self.get_head_position(), BORDER_COLOR)
-        # Закрашивание последнего квадрата для сим-ии движения
-        if self.last:
-            last_rect = pg.Rect(self.last, (GRID_SIZE, GRID_SIZE))
-            pg.draw.rect(screen, BOARD_BACKGROUND_COLOR, last_rect)
-
-    def delete_dropped_tail(self):
-        """Метод удаляет потерянный хвост при поедании инжира."""
-        dropped_tail = pg.Rect(self.positions.pop(),
-                               (GRID_SIZE, GRID_SIZE))
-        pg.draw.rect(screen, BOARD_BACKGROUND_COLOR, dropped_tail)
-
-    def update_direction(self):
-        """Метод для обновления направления змейки."""
-        if self.next_direction:
-            self.direction = self.next_direction
-            self.next_direction = None
+    def invalidate(self):
+        """Метод отмечает, что объект нужно нарисовать заново целиком."""
+        self.drawn_position = None
+
+
+class Snake(engine.Snake, GameObject):
+    """
+    Класс отвечающий за отрисовку змейки.
+    Между кадрами змейка может сделать несколько ходов, поэтому новые клетки
+    головы (added_cells) и убранные клетки хвоста (erased_cells) копятся
+    до следующей отрисовки.
+    """
 
     def move(self):
-        """
-        Метод реализует логику движения змейки
-        и перехода через край поля.
-        """
-        new_head_position = (
-            (self.get_head_position()[0] + GRID_SIZE
-             * self.direction[0]) % SCREEN_WIDTH,
-            (self.get_head_position()[1] + GRID_SIZE
-             * self.direction[1]) % SCREEN_HEIGHT
-        )
-        # Вставляем новую голову змейки в начало списка
-        self.positions.insert(0, new_head_position)
-        # Назначаем квадратик, который предстоит стереть
-        self.last = self.positions[-1] if len(
-            self.positions) > self.length else None
-        while len(self.positions) > self.length:
-            self.delete_dropped_tail()
-
-    def get_head_position(self):
-        """Метод возвращает позицию головы змейки."""
-        return self.positions[0]
+        """Метод двигает змейку и запоминает изменившиеся клетки."""
+        super().move()
+        self.added_cells.append(self.get_head_position())
+        self.erased_cells.extend(self.dropped_tail)
+
+    def draw(self):
+        """Метод визуализации змейки и стирания ее хвоста при движении."""
+        # После очистки экрана рисуем все тело, иначе - только изменения:
+        # клетки, которые змейка уже покинула, стираем, занятые - рисуем
+        if self.drawn_position is None:
+            for position in self.positions:
+                self.draw_rect(position, BORDER_COLOR)
+        else:
+            for position in self.erased_cells:
+                if position not in self.positions:
+                    erase_rect(position)
+            for position in self.added_cells:
+                if position in self.positions:
+                    self.draw_rect(position, BORDER_COLOR)
+        self.added_cells.clear()
+        self.erased_cells.clear()
+        self.drawn_position = self.get_head_position()
 
     def reset(self):
-        """Метод возвращает змейку к исходному состоянию."""
-        self.positions = [self.position]
-        self.length = 1
-        self.direction = RIGHT
+        """Метод сбрасывает змейку, после чего поле рисуется заново."""
+        super().reset()
+        self.added_cells = []
+        self.erased_cells = []
+        self.invalidate()
 
 
-class Apple(GameObject):
+class Apple(engine.Apple, GameObject):
     """Класс Яблока - полезная еда, увеличивающая длину змейки на 1."""
 
-    def __init__(self, color=APPLE_COLOR, occupied_cells=None):
-        """Метод инициализации экземпляра класса."""
-        if occupied_cells is None:
-            occupied_cells = []
-        super().__init__(color)
-        self.randomize_position(occupied_cells=occupied_cells)
-
-    def randomize_position(self, occupied_cells=[SCREEN_MIDDLE]):
-        """Метод задания случайных координат в пределах игрового поля."""
-        self.position = (randrange(GRID_SIZE, SCREEN_WIDTH, GRID_SIZE),
-                         randrange(GRID_SIZE, SCREEN_HEIGHT, GRID_SIZE))
-        while self.position in occupied_cells:
-            self.position = (randrange(GRID_SIZE, SCREEN_WIDTH, GRID_SIZE),
-                             randrange(GRID_SIZE, SCREEN_HEIGHT, GRID_SIZE))
-
     def draw(self):
-        """Метод визуализации яблока."""
-        self.draw_rect(self.position, BORDER_COLOR)
+        """Метод визуализации яблока, если оно появилось на новом месте."""
+        if self.drawn_position != self.position:
+            self.draw_rect(self.position, BORDER_COLOR)
+            self.drawn_position = self.position
 
 
-class Fig(Apple):
+class Fig(engine.Fig, Apple):
     """Класс Инжир - вредная еда, уменьшающая длину змейки на 1."""
 
-    def __init__(self, color=FIG_COLOR, occupied_cells=None):
-        """Метод инициализации экземпляра класса."""
-        if occupied_cells is None:
-            occupied_cells = []
-        super().__init__(color)
-        self.randomize_position(occupied_cells=occupied_cells)
 
-
-class StoneWall(Apple):
+class StoneWall(engine.StoneWall, Apple):
     """Класс каменная стена - препятствие, при столкновении обнуляет игру."""
 
-    def __init__(self, color=WALL_COLOR, occupied_cells=None):
-        """Метод инициализации экземпляра класса."""
-        if occupied_cells is None:
-            occupied_cells = []
-        super().__init__(color)
-        # Выбираем случайное направление стены
-        self.choose_direction()
-        # Удлинняем стену в выбранном направлении
-        self.positions = [
-            (self.position[0] + self.direction[0] * GRID_SIZE * i,
-             self.position[1] + self.direction[1] * GRID_SIZE * i
-             ) for i in range(9)]
-        self.randomize_position(occupied_cells=occupied_cells)
-
-    def choose_direction(self):
-        """Выбираем случайное направление для стены в координатах поля."""
-        if randrange(1, 3) > 1:
-            self.direction = DOWN
-        else:
-            self.direction = RIGHT
-
     def draw(self):
-        """Метод визуализации инжира."""
-        for position in self.positions:
-            self.draw_rect(position, BORDER_COLOR)
+        """
+        Метод визуализации стены. Стена статична, поэтому рисуется в фон
+        поля один раз, когда появляется на новом месте.
+        """
+        if self.drawn_position != self.position:
+            sprite = get_cell_sprite(self.body_color, BORDER_COLOR)
+            if chunk_board is not None:
+                chunk_board.draw_static(sprite, self.positions)
+                self.drawn_position = self.position
+                return
+            background.blits([(sprite, position)
+                              for position in self.positions], False)
+            for position in self.positions:
+                erase_rect(position)
+            self.drawn_position = self.position
+
+
+class LevelMap(engine.LevelMap, StoneWall):
+    """Класс неподвижной карты уровня, рисуется в фон поля как стены."""
 
 
 # Набор функций ответа на нажатия клавиш пользователем
@@ -217,28 +220,42 @@ def k_escape_event(game_object):
 
 
 def k_up_event(game_object, key):
-    """Функция при нажатии клавиши UP."""
-    if key == pg.K_UP and game_object.direction != DOWN:
-        game_object.next_direction = UP
-    if key == pg.K_DOWN and game_object.direction != UP:
-        game_object.next_direction = DOWN
-    if key == pg.K_LEFT and game_object.direction != RIGHT:
-        game_object.next_direction = LEFT
-    if key == pg.K_RIGHT and game_object.direction != LEFT:
-        game_object.next_direction = RIGHT
-    game_object.update_direction()
+    """Функция при нажатии клавиш со стрелками."""
+    game_object.snake.turn(key_directions[key])
+
+
+def k_t_event(game_object, key):
+    """Функция при нажатии клавиши T - включить или выключить турбо-режим."""
+    game_object.turbo = not game_object.turbo
+
+
+def k_a_event(game_object, key):
+    """Функция при нажатии клавиши A - включить или выключить автопилот."""
+    if game_object.autopilot is None:
+        game_object.autopilot = Autopilot()
+    else:
+        game_object.autopilot = None
 
 
 def k_1_event(game_object, key):
-    """Установить 1 сложность. Инжиров - 1. Нет стены. Скорость 10."""
+    """
+    Установить сложность 1 или 2 по таблице DIFFICULTY_LEVELS.
+    Уровень применяется и змейка сбрасывается в следующем тике игры.
+    """
     if key == pg.K_1:
-        game_object.difficulty = 1
+        game_object.next_difficulty = 1
     elif key == pg.K_2:
-        game_object.difficulty = 2
-    screen.fill(BOARD_BACKGROUND_COLOR)
-    game_object.reset()
+        game_object.next_difficulty = 2
 
 
+# Cловарь с клавишами-стрелками и направлениями, которые они задают
+key_directions = {
+    pg.K_UP: UP,
+    pg.K_DOWN: DOWN,
+    pg.K_LEFT: LEFT,
+    pg.K_RIGHT: RIGHT
+}
+
 # Cловарь с ключами - нажатиями клавиш и значениями - функциями,
 #  которые они исполняют
 key_functions = {
@@ -248,12 +265,17 @@ key_functions = {
     pg.K_LEFT: k_up_event,
     pg.K_RIGHT: k_up_event,
     pg.K_1: k_1_event,
-    pg.K_2: k_1_event
+    pg.K_2: k_1_event,
+    pg.K_t: k_t_event,
+    pg.K_a: k_a_event
 }
 
 
 def handle_keys(game_object):
-    """Функция обрабатывает ввод пользователя при помощи словаря функций."""
+    """
+    Функция обрабатывает ввод пользователя при помощи словаря функций.
+    game_object - партия, которой управляет игрок.
+    """
     for event in pg.event.get():
         if event.type == pg.QUIT:
             k_escape_event(game_object)
@@ -262,20 +284,261 @@ def handle_keys(game_object):
                 key_functions[event.key](game_object, event.key)
 
 
-def check_figs(snake, figs):
-    """Вспомогательная функция для цикла игры, проверяет поедание инжира."""
-    for fig in figs:
-        if snake.get_head_position() == fig.position:
-            if snake.length > 1:
-                snake.length -= 1
-            fig.randomize_position(snake.positions)
+class ChunkBoard:
+    """
+    Класс отрисовки поля больше окна. Камера следует за головой змейки,
+    поле разбито на квадратные куски по CHUNK_CELLS клеток. Рисуются только
+    куски, попавшие в окно; готовые куски хранятся в кэше (chunks) и при
+    движении камеры только переставляются на экране. Изменения объектов
+    рисуются сразу в кусках из кэша, остальные куски при появлении в окне
+    строятся заново по состоянию партии. У каждого куска свой фон
+    со статичными объектами, как у экрана в обычном режиме.
+    Клетки стен и карты уровня разложены по кускам (statics), поэтому
+    построение куска рисует только попавшие в него клетки, а не все стены
+    поля.
+    """
 
+    def __init__(self, game, chunk_cells=CHUNK_CELLS,
+                 cache_size=CHUNK_CACHE_SIZE):
+        """Метод инициализации отрисовки поля партии game."""
+        self.game = game
+        self.width = game.free_cells.width
+        self.height = game.free_cells.height
+        self.chunk_size = chunk_cells * GRID_SIZE
+        self.cache_size = cache_size
+        self.chunks = OrderedDict()
+        self.statics = None
+
+    def chunk_key(self, position):
+        """Метод возвращает номер куска, в который попадает клетка."""
+        return position[0] // self.chunk_size, position[1] // self.chunk_size
+
+    def _locate(self, position):
+        """
+        Метод возвращает кусок из кэша (поверхность и фон) и позицию клетки
+        в нем или None, если куска в кэше нет.
+        """
+        key = self.chunk_key(position)
+        chunk = self.chunks.get(key)
+        if chunk is None:
+            return None
+        return chunk, (position[0] - key[0] * self.chunk_size,
+                       position[1] - key[1] * self.chunk_size)
+
+    def draw(self, sprite, position):
+        """Метод рисует клетку, если ее кусок есть в кэше."""
+        located = self._locate(position)
+        if located is not None:
+            (surface, _), local = located
+            surface.blit(sprite, local)
+
+    def erase(self, position):
+        """Метод стирает клетку, восстанавливая под ней фон куска."""
+        located = self._locate(position)
+        if located is not None:
+            (surface, chunk_background), local = located
+            surface.blit(chunk_background, local,
+                         pg.Rect(local, (GRID_SIZE, GRID_SIZE)))
+
+    def draw_static(self, sprite, positions):
+        """
+        Метод рисует статичные клетки в фон и на поверхность кусков.
+        Стены сменили место, поэтому их раскладка по кускам строится заново.
+        """
+        self.statics = None
+        for position in positions:
+            located = self._locate(position)
+            if located is not None:
+                chunk, local = located
+                for surface in chunk:
+                    surface.blit(sprite, local)
+
+    def clear(self):
+        """Метод очищает кэш - все куски будут построены заново."""
+        self.chunks.clear()
+        self.statics = None
+
+    def static_cells(self, key):
+        """
+        Метод возвращает клетки стен и карты уровня в куске key парами
+        (спрайт, клетка). Раскладка по кускам строится один раз на
+        расстановку стен.
+        """
+        if self.statics is None:
+            self.statics = {}
+            for stone_wall in self.game.obstacles:
+                sprite = get_cell_sprite(stone_wall.body_color, BORDER_COLOR)
+                for position in stone_wall.get_cells():
+                    self.statics.setdefault(
+                        self.chunk_key(position), []).append(
+                            (sprite, position))
+        return self.statics.get(key, ())
+
+    def moving_cells(self, key, left, top, size):
+        """
+        Генератор клеток остальных объектов в куске key с левым верхним
+        углом (left, top) и размером size парами (спрайт, клетка).
+        Змейку проверяем по клеткам куска - ее тело отвечает на "клетка
+        занята" за O(1), а сама она может быть длиннее куска.
+        """
+        for game_object in self.game.get_objects():
+            layer = game_object.layer
+            # Стены уже нарисованы в фон куска
+            if layer == engine.WALL_LAYER:
+                continue
+            sprite = get_cell_sprite(game_object.body_color, BORDER_COLOR)
+            if layer == engine.SNAKE_LAYER:
+                body = game_object.get_cells()
+                for x in range(left, left + size[0], GRID_SIZE):
+                    for y in range(top, top + size[1], GRID_SIZE):
+                        if (x, y) in body:
+                            yield sprite, (x, y)
+                continue
+            for position in game_object.get_cells():
+                if self.chunk_key(position) == key:
+                    yield sprite, position
+
+    def build(self, key):
+        """Метод строит кусок по состоянию партии и кладет его в кэш."""
+        left, top = key[0] * self.chunk_size, key[1] * self.chunk_size
+        size = (min(self.chunk_size, self.width - left),
+                min(self.chunk_size, self.height - top))
+        surface, chunk_background = chunk = (pg.Surface(size),
+                                             pg.Surface(size))
+        chunk_background.fill(BOARD_BACKGROUND_COLOR)
+        self.chunks[key] = chunk
+        chunk_background.blits(
+            [(sprite, (x - left, y - top))
+             for sprite, (x, y) in self.static_cells(key)], False)
+        surface.blit(chunk_background, (0, 0))
+        surface.blits(
+            [(sprite, (x - left, y - top))
+             for sprite, (x, y) in self.moving_cells(key, left, top, size)],
+            False)
+        return chunk
+
+    def spans(self, start, length, board_length):
+        """
+        Генератор кусков вдоль одной оси окна длиной length, начиная
+        с координаты поля start, с переходом через край поля.
+        Отдает номер куска и его смещение относительно края окна.
+        """
+        offset, position = 0, start
+        while offset < length:
+            index = position // self.chunk_size
+            yield index, offset - (position - index * self.chunk_size)
+            end = min((index + 1) * self.chunk_size, board_length)
+            offset += end - position
+            position = end % board_length
+
+    def render(self, focus):
+        """
+        Метод рисует на экране куски, попавшие в окно с центром
+        в клетке focus, и убирает из кэша давно не видимые куски.
+        """
+        left = (focus[0] + (GRID_SIZE - SCREEN_WIDTH) // 2) % self.width
+        top = (focus[1] + (GRID_SIZE - SCREEN_HEIGHT) // 2) % self.height
+        blits = []
+        for row, y in self.spans(top, SCREEN_HEIGHT, self.height):
+            for column, x in self.spans(left, SCREEN_WIDTH, self.width):
+                key = (column, row)
+                chunk = self.chunks.get(key)
+                if chunk is None:
+                    chunk = self.build(key)
+                self.chunks.move_to_end(key)
+                blits.append((chunk[0], (x, y)))
+        screen.blits(blits, False)
+        while len(self.chunks) > self.cache_size:
+            self.chunks.popitem(last=False)
+
+
+def setup_board(game):
+    """
+    Функция выбирает отрисовку поля партии: с камерой и кусками, если поле
+    больше окна, иначе - обычную.
+    """
+    global chunk_board
+    if (game.free_cells.width > SCREEN_WIDTH
+            or game.free_cells.height > SCREEN_HEIGHT):
+        chunk_board = ChunkBoard(game)
+    else:
+        chunk_board = None
 
-def check_wall_bump(snake, stone_wall):
-    """Функция проверки столкновения со стеной."""
-    if snake.get_head_position() in stone_wall.positions:
-        screen.fill(BOARD_BACKGROUND_COLOR)
-        snake.reset()
+
+def redraw_board(game):
+    """
+    Функция очищает фон и экран и отмечает все объекты партии для отрисовки.
+    Накопленная очередь кадра больше не нужна - экран рисуется заново.
+    """
+    for game_object in game.get_objects():
+        game_object.invalidate()
+    if chunk_board is not None:
+        chunk_board.clear()
+        return
+    background.fill(BOARD_BACKGROUND_COLOR)
+    blit_queue[:] = [(background, (0, 0))]
+    dirty_rects[:] = [screen.get_rect()]
+
+
+class ProfilerOverlay:
+    """
+    Класс оверлея со сводкой замеров кадра поверх поля.
+    Перед выводом оверлея часть экрана под ним сохраняется (underlay)
+    и возвращается на место в следующем кадре, поэтому поле под оверлеем
+    не нужно перерисовывать.
+    """
+
+    def __init__(self, profiler):
+        """Метод инициализации оверлея для замеров profiler."""
+        self.profiler = profiler
+        self.font = pg.font.Font(None, 20)
+        self.text = None
+        self.rect = None
+        self.underlay = None
+        self.frames = 0
+
+    def restore(self):
+        """Метод возвращает на экран поле под оверлеем прошлого кадра."""
+        if self.underlay is not None:
+            screen.blit(self.underlay, self.rect)
+            dirty_rects.append(self.rect)
+
+    def draw(self):
+        """Метод рисует оверлей, обновляя текст раз в несколько кадров."""
+        if self.frames % OVERLAY_REFRESH_FRAMES == 0:
+            frame = self.profiler.rings['frame']
+            self.text = self.font.render(
+                f'frame p50 {frame.percentile(50):.1f} ms, '
+                f'p99 {frame.percentile(99):.1f} ms, '
+                f'dropped ticks {self.profiler.dropped_ticks}',
+                True, BORDER_COLOR, BOARD_BACKGROUND_COLOR)
+        self.frames += 1
+        self.rect = self.text.get_rect(topleft=(4, 4)).clip(screen.get_rect())
+        self.underlay = screen.subsurface(self.rect).copy()
+        screen.blit(self.text, self.rect)
+        dirty_rects.append(self.rect)
+
+
+def update_display(overlay=None, focus=None, capture=None):
+    """
+    Функция рисует очередь кадра на экране одним вызовом blits и выводит
+    на дисплей только изменившиеся области. Оверлей рисуется поверх кадра.
+    Для поля больше окна экран рисуется заново вокруг клетки focus.
+    Если идет запись кадров (capture), изменившиеся области уходят в нее.
+    """
+    if chunk_board is not None:
+        chunk_board.render(focus)
+        dirty_rects[:] = [screen.get_rect()]
+    elif overlay is not None:
+        overlay.restore()
+    screen.blits(blit_queue, False)
+    blit_queue.clear()
+    if overlay is not None:
+        overlay.draw()
+    pg.display.update(dirty_rects)
+    if capture is not None:
+        capture.capture(screen, dirty_rects)
+    dirty_rects.clear()
 
 
 def draw_objects(*args):
@@ -284,94 +547,321 @@ def draw_objects(*args):
         object.draw()
 
 
-def get_occupied_positions(*args):
-    """Функция возвращает список занятых в данный момент клеток."""
-    res = []
-    for object in args:
-        if hasattr(object, 'positions'):
-            res += object.positions
-        elif object is None:
-            continue
-        elif isinstance(object, list):
-            res += object
-        else:
-            res.append(object.position)
-    return res
+class SnakeGame(engine.Game):
+    """
+    Класс партии с объектами, которые умеют рисовать себя на экране.
+    Атрибут turbo - игра без ограничения скорости, replay - запись партии
+    (snake_replay.Replay) или None, profiler - замеры фаз кадра
+    (snake_profiler.FrameProfiler) или None, overlay - оверлей замеров,
+    autopilot - автопилот (snake_autopilot.Autopilot), который ведет змейку
+    вместо игрока, или None, capture - запись кадров
+    (snake_capture.FrameCapture) или None.
+    """
+
+    turbo = False
+    autopilot = None
+    replay = None
+    profiler = None
+    capture = None
+    overlay = None
+    snake_class = Snake
+    apple_class = Apple
+    fig_class = Fig
+    stone_wall_class = StoneWall
+    level_map_class = LevelMap
 
 
-def check_snake_events(snake, apple, *objects):
-    """Функция проверяет столкновение с собой и поедание яблока"""
-    objects = list(objects)
-    if snake.get_head_position() == apple.position:
-        snake.length += 1
-        apple.randomize_position(occupied_cells=get_occupied_positions(
-            snake, *objects))
-        # Проверка "Столкнулись с собой"
-    elif snake.get_head_position() in snake.positions[4:]:
-        screen.fill(BOARD_BACKGROUND_COLOR)
-        snake.reset()
+class PipelinedGame(SnakeGame):
+    """
+    Партия конвейерного режима (run_pipelined). Рисуются снимки партии,
+    а не ее объекты, поэтому объекты берутся из движка - без состояния
+    отрисовки, которое копилось бы между кадрами.
+    """
 
+    snake_class = engine.Snake
+    apple_class = engine.Apple
+    fig_class = engine.Fig
+    stone_wall_class = engine.StoneWall
+    level_map_class = engine.LevelMap
 
-def game_cycle_body(snake, apple, *figs, stone_wall=None):
+
+def game_tick(game):
+    """
+    Функция исполняет один логический тик игры - смену уровня сложности,
+    движение змейки и проверку событий игры. Если включен автопилот, он
+    выбирает поворот вместо игрока. Если партия записывается, тик сначала
+    попадает в запись.
+    """
+    if game.autopilot is not None:
+        game.snake.turns.clear()
+        direction = game.autopilot(game)
+        if direction is not None:
+            game.snake.turn(direction)
+    if game.replay is not None:
+        game.replay.record(game)
+    profiler = game.profiler
+    if profiler is None:
+        game.step()
+        return
+    start = perf_counter()
+    game.move_snake()
+    start = profiler.measure('move', start)
+    game.check_events()
+    profiler.measure('collisions', start)
+
+
+def simulate(game, accumulator):
+    """
+    Функция исполняет накопившиеся за кадр тики с фиксированным шагом.
+    Возвращает число тиков и остаток времени в мс для следующего кадра.
+    """
+    tick_time = 1000 / game.speed
+    if accumulator > MAX_SIMULATION_LAG:
+        if game.profiler is not None:
+            game.profiler.dropped_ticks += int(
+                (accumulator - MAX_SIMULATION_LAG) // tick_time)
+        accumulator = MAX_SIMULATION_LAG
+    ticks = 0
+    while accumulator >= tick_time:
+        game_tick(game)
+        accumulator -= tick_time
+        ticks += 1
+    return ticks, accumulator
+
+
+def simulate_turbo(game):
     """
-    Функция исполняет основные события игрового цикла - проверку ввода игрока,
-    движение змейки,  проверка событий игры и отрисовка объектов.
+    Функция исполняет тики без ограничения скорости, пока не истечет время
+    одного кадра. Возвращает число тиков.
+    """
+    frame_end = pg.time.get_ticks() + 1000 // FPS
+    ticks = 0
+    while pg.time.get_ticks() < frame_end:
+        game_tick(game)
+        ticks += 1
+    return ticks
+
+
+def render_frame(game):
+    """Функция рисует изменения партии и выводит их на дисплей."""
+    start = perf_counter()
+    # Змейка сброшена - очищаем экран и рисуем поле заново
+    if game.snake.drawn_position is None:
+        redraw_board(game)
+    draw_objects(*game.get_objects())
+    focus = game.snake.get_head_position()
+    if game.profiler is None:
+        update_display(focus=focus, capture=game.capture)
+        return
+    start = game.profiler.measure('draw', start)
+    update_display(game.overlay, focus, game.capture)
+    game.profiler.measure('present', start)
+
+
+class SnapshotRenderer:
+    """
+    Класс отрисовки партии по снимкам тиков (snake_pipeline.TickSnapshot)
+    для конвейерного режима. Объекты партии меняет поток симуляции, поэтому
+    рисуется не партия, а снимок: только клетки, которые изменились
+    с последнего нарисованного снимка drawn. Атрибут cells - цвета клеток
+    змейки и еды в нарисованном снимке.
     """
-    figs = list(figs)
-    handle_keys(snake)
-    snake.move()
-    check_snake_events(snake, apple, stone_wall, figs)
-    check_figs(snake, figs)
-    draw_objects(snake, apple, figs[0])
 
+    def __init__(self):
+        """Метод инициализации: первый снимок рисуется целиком."""
+        self.drawn = None
+        self.cells = {}
+
+    def redraw(self, snapshot):
+        """Метод рисует фон со стенами заново и очищает экран."""
+        background.fill(BOARD_BACKGROUND_COLOR)
+        sprite = get_cell_sprite(engine.WALL_COLOR, BORDER_COLOR)
+        background.blits([(sprite, position)
+                          for position in snapshot.walls], False)
+        blit_queue[:] = [(background, (0, 0))]
+        dirty_rects[:] = [screen.get_rect()]
+        self.cells = {}
+
+    def draw(self, snapshot):
+        """Метод рисует изменения от нарисованного снимка до snapshot."""
+        if self.drawn is None or snapshot.walls is not self.drawn.walls:
+            self.redraw(snapshot)
+        cells = dict.fromkeys(snapshot.figs, engine.FIG_COLOR)
+        cells[snapshot.apple] = engine.APPLE_COLOR
+        cells.update(dict.fromkeys(snapshot.snake, engine.SNAKE_COLOR))
+        drawn = self.cells
+        for position in drawn:
+            if position not in cells:
+                erase_rect(position)
+        for position, color in cells.items():
+            if drawn.get(position) != color:
+                blit_queue.append(
+                    (get_cell_sprite(color, BORDER_COLOR), position))
+                dirty_rects.append(get_cell_rect(position))
+        self.cells = cells
+        self.drawn = snapshot
+
+    def render(self, snapshot, game):
+        """Метод рисует снимок и выводит изменения на дисплей."""
+        start = perf_counter()
+        self.draw(snapshot)
+        if game.profiler is None:
+            update_display(capture=game.capture)
+            return
+        start = game.profiler.measure('draw', start)
+        update_display(game.overlay, capture=game.capture)
+        game.profiler.measure('present', start)
+
+
+def forward_keys(game, simulation):
+    """
+    Функция обрабатывает ввод в конвейерном режиме: окно закрывается
+    сразу, остальные клавиши уходят командами в поток симуляции.
+    """
+    for event in pg.event.get():
+        if event.type == pg.QUIT:
+            k_escape_event(game)
+        elif event.type == pg.KEYDOWN:
+            if event.key == pg.K_ESCAPE:
+                k_escape_event(game)
+            elif event.key in key_functions:
+                simulation.submit(key_functions[event.key], event.key)
 
-def game_cycle_easy(snake, fig1, apple, game_speed):
-    """Цикл игры при сложности 1."""
-    while True:
-        clock.tick(game_speed - 10)
-        game_cycle_body(snake, apple, fig1)
-        if snake.difficulty == 2:
-            break
-        pg.display.update()
-    stone_wall = StoneWall(occupied_cells=get_occupied_positions(
-        snake, apple, fig1))
-    fig2 = Fig(occupied_cells=get_occupied_positions(
-        snake, apple, fig1, stone_wall))
-    fig3 = Fig(occupied_cells=get_occupied_positions(
-        snake, apple, fig1, fig2, stone_wall))
-    game_cycle_hard(snake, fig1, fig2, fig3, stone_wall, apple, game_speed)
-
-
-def game_cycle_hard(snake, fig1, fig2, fig3,
-                    stone_wall, apple, game_speed):
-    """Цикл игры при сложности 2."""
+
+def run_pipelined(game):
+    """
+    Функция с конвейерным циклом игры (см. snake_pipeline): тики исполняет
+    поток симуляции, а этот цикл с частотой кадров FPS опрашивает ввод
+    и рисует последний опубликованный снимок. Партия - PipelinedGame,
+    поле - размером с окно.
+    """
+    if chunk_board is not None:
+        raise ValueError('Конвейерный режим рисует только поле размером '
+                         'с окно')
+    simulation = Simulation(game, game_tick)
+    renderer = SnapshotRenderer()
+    simulation.start()
+    try:
+        while True:
+            elapsed = clock.tick(FPS)
+            if game.profiler is None:
+                forward_keys(game, simulation)
+            else:
+                game.profiler.add('frame', elapsed)
+                start = perf_counter()
+                forward_keys(game, simulation)
+                game.profiler.measure('input', start)
+                game.profiler.dropped_ticks = simulation.dropped_ticks
+            simulation.check()
+            snapshot = simulation.buffer.latest()
+            if snapshot is not renderer.drawn:
+                renderer.render(snapshot, game)
+    finally:
+        simulation.stop()
+
+
+def run_game(game):
+    """
+    Функция с основным циклом игры. Один цикл на все уровни сложности.
+    Ввод и отрисовка идут с частотой кадров FPS, а игра - фиксированными
+    тиками со скоростью текущего уровня; в турбо-режиме - без ограничения.
+    Кадр без новых тиков не перерисовывается.
+    """
+    render_frame(game)
+    accumulator = 0
     while True:
-        clock.tick(game_speed)
-        check_wall_bump(snake, stone_wall)
-        draw_objects(fig2, fig3, stone_wall)
-        game_cycle_body(snake, apple, fig1, fig2, fig3, stone_wall=stone_wall)
-        if snake.difficulty == 1:
-            del fig2
-            del fig3
-            del stone_wall
-            break
-        pg.display.update()
-    game_cycle_easy(snake, fig1, apple, game_speed)
-
-
-def main():
-    """Функция с основной логикой игры."""
-    # Инициализация pg:
+        elapsed = clock.tick(FPS)
+        accumulator += elapsed
+        if game.profiler is None:
+            handle_keys(game)
+        else:
+            game.profiler.add('frame', elapsed)
+            start = perf_counter()
+            handle_keys(game)
+            game.profiler.measure('input', start)
+        if game.turbo:
+            ticks, accumulator = simulate_turbo(game), 0
+        else:
+            ticks, accumulator = simulate(game, accumulator)
+        if ticks:
+            render_frame(game)
+
+
+def main(record_path=None, profile=False, profile_path=None,
+         board_size=(GRID_WIDTH, GRID_HEIGHT), autopilot=False,
+         capture_path=None, levels_path=None, pipelined=False):
+    """
+    Функция с основной логикой игры.
+    Если задан record_path, партия записывается в этот файл при выходе.
+    profile - показывать оверлей с замерами фаз кадра, profile_path - файл
+    (.csv или .json), куда замеры выгружаются при выходе.
+    board_size - размер поля в клетках, поле может быть больше окна.
+    autopilot - начать игру с включенным автопилотом.
+    capture_path - куда записывать кадры (см. snake_capture.open_sink).
+    levels_path - файл пакета уровней (см. snake_levels) вместо таблицы
+    DIFFICULTY_LEVELS.
+    pipelined - исполнять тики в отдельном потоке (см. run_pipelined).
+    """
+    # Инициализация pg, окна и часов:
     pg.init()
-    # Создаем объекты классов
-    snake = Snake()
-    apple = Apple(occupied_cells=get_occupied_positions(snake))
-    fig1 = Fig(occupied_cells=get_occupied_positions(snake, apple))
-    # Располагаем и отрисовываем основные объекты на экране
-    draw_objects(snake, apple, fig1)
-    # Входим в основной цикл игры
-    game_cycle_easy(snake, fig1, apple, SPEED)
+    init_display()
+    # Создаем партию и запускаем основной цикл игры
+    levels = None
+    if levels_path is not None:
+        levels = load_levels(levels_path, board_size)
+    game_class = PipelinedGame if pipelined else SnakeGame
+    game = game_class(board_size=board_size, levels=levels)
+    setup_board(game)
+    if autopilot:
+        game.autopilot = Autopilot()
+    if record_path is not None:
+        game.replay = Replay(game.seed, game.difficulty,
+                             board_size=board_size,
+                             levels_digest=pack_digest(levels_path))
+    if profile or profile_path is not None:
+        game.profiler = FrameProfiler()
+        if profile:
+            game.overlay = ProfilerOverlay(game.profiler)
+    if capture_path is not None:
+        game.capture = FrameCapture(open_sink(capture_path))
+    try:
+        if pipelined:
+            run_pipelined(game)
+        else:
+            run_game(game)
+    finally:
+        if game.capture is not None:
+            game.capture.close()
+        if record_path is not None:
+            game.replay.save(record_path)
+        if profile_path is not None:
+            game.profiler.export(profile_path)
 
 
 if __name__ == '__main__':
-    main()
+    parser = argparse.ArgumentParser(description='Змейка')
+    parser.add_argument('--record', metavar='PATH',
+                        help='записать партию в файл для повтора')
+    parser.add_argument('--profile', action='store_true',
+                        help='показать замеры фаз кадра на экране')
+    parser.add_argument('--profile-export', metavar='PATH',
+                        help='выгрузить замеры при выходе в .csv или .json')
+    parser.add_argument('--board', metavar='WxH', default=None,
+                        help='размер поля в клетках, например 2000x2000')
+    parser.add_argument('--autopilot', action='store_true',
+                        help='начать игру с включенным автопилотом')
+    parser.add_argument('--capture', metavar='PATH',
+                        help='записывать кадры: в каталог - файлами PNG, '
+                        'в файл или "-" (stdout) - байтами RGB')
+    parser.add_argument('--levels', metavar='PATH',
+                        help='пакет уровней вместо встроенных уровней')
+    parser.add_argument('--pipelined', action='store_true',
+                        help='исполнять тики в отдельном потоке, '
+                        'независимо от отрисовки')
+    args = parser.parse_args()
+    if args.board is None:
+        board_size = (GRID_WIDTH, GRID_HEIGHT)
+    else:
+        board_size = tuple(int(size) for size in args.board.split('x'))
+    main(args.record, args.profile, args.profile_export, board_size,
+         args.autopilot, args.capture, args.levels, args.pipelined)